@@ -11,9 +11,41 @@ class ConfigManager(static):
 
     _tbl_ext = ".tbl"
     _ndx_ext = ".ndx"
+    _wal_ext = ".wal"
 
     _is_exit = False
     _page_size = 512
+    # Page sizes a table can be created with. system_tables stores the size
+    # as a SMALLINT and cell offsets are two bytes, 16K is the largest.
+    _page_sizes = (512, 1024, 2048, 4096, 8192, 16384)
+    # Bytes of decoded leaf pages kept resident across all open tables.
+    _buffer_pool_size = 64 * 1024 * 1024
+    # Statements that may share one fsync of the write-ahead log, and the
+    # longest a committed statement waits for the rest of its group.
+    _wal_group_commit = 8
+    _wal_commit_delay = 0.05
+    # Logged pages that trigger a checkpoint back into the data files.
+    _wal_checkpoint_pages = 1024
+    # Share of each node filled when a tree is bulk loaded from sorted rows.
+    _bulk_fill_factor = 0.9
+    # User tables (and, separately, indexes) kept open between statements.
+    _open_tables = 16
+    # Tables of at least this many rows that are scanned again without
+    # changing in between get a columnar mirror for vectorized WHERE clauses.
+    _columnar_scan = True
+    _columnar_min_rows = 10000
+    # Distinct TEXT values a column may add to its table's dictionary, the
+    # values past that are stored as they are.
+    _dictionary_column_words = 256
+    # Whether leaves of at least packed_min_rows rows store their integer,
+    # DATE and DATETIME columns bit-packed against a per-page base, see
+    # packed_columns. Pages say how they are stored, files written either
+    # way are read back either way.
+    _packed_columns = False
+    _packed_min_rows = 128
+    # Page codec new tables and their indexes are compressed with when
+    # CREATE TABLE doesn't name one, None for plain pages.
+    _compression = None
 
     @staticmethod
     def line(rep_s: str, n_reps: int) -> str:
@@ -39,6 +71,54 @@ class ConfigManager(static):
     def set_ndx_ext(cls, value: str):
         cls._idx_ext = value
 
+    @classmethod
+    def set_buffer_pool_size(cls, value: int):
+        cls._buffer_pool_size = value
+
+    @classmethod
+    def set_wal_group_commit(cls, value: int):
+        cls._wal_group_commit = value
+
+    @classmethod
+    def set_wal_commit_delay(cls, value: float):
+        cls._wal_commit_delay = value
+
+    @classmethod
+    def set_wal_checkpoint_pages(cls, value: int):
+        cls._wal_checkpoint_pages = value
+
+    @classmethod
+    def set_bulk_fill_factor(cls, value: float):
+        cls._bulk_fill_factor = value
+
+    @classmethod
+    def set_open_tables(cls, value: int):
+        cls._open_tables = value
+
+    @classmethod
+    def set_columnar_scan(cls, value: bool):
+        cls._columnar_scan = value
+
+    @classmethod
+    def set_columnar_min_rows(cls, value: int):
+        cls._columnar_min_rows = value
+
+    @classmethod
+    def set_dictionary_column_words(cls, value: int):
+        cls._dictionary_column_words = value
+
+    @classmethod
+    def set_packed_columns(cls, value: bool):
+        cls._packed_columns = value
+
+    @classmethod
+    def set_packed_min_rows(cls, value: int):
+        cls._packed_min_rows = value
+
+    @classmethod
+    def set_compression(cls, value: str):
+        cls._compression = value
+
     @classmethod
     def get_prompt(cls, value: str):
         cls._prompt = value
@@ -82,3 +162,59 @@ class ConfigManager(static):
     @classmethod
     def get_page_size(cls) -> int:
         return cls._page_size
+
+    @classmethod
+    def get_page_sizes(cls) -> tuple:
+        return cls._page_sizes
+
+    @classmethod
+    def get_buffer_pool_size(cls) -> int:
+        return cls._buffer_pool_size
+
+    @classmethod
+    def get_wal_ext(cls) -> str:
+        return cls._wal_ext
+
+    @classmethod
+    def get_wal_group_commit(cls) -> int:
+        return cls._wal_group_commit
+
+    @classmethod
+    def get_wal_commit_delay(cls) -> float:
+        return cls._wal_commit_delay
+
+    @classmethod
+    def get_wal_checkpoint_pages(cls) -> int:
+        return cls._wal_checkpoint_pages
+
+    @classmethod
+    def get_bulk_fill_factor(cls) -> float:
+        return cls._bulk_fill_factor
+
+    @classmethod
+    def get_open_tables(cls) -> int:
+        return cls._open_tables
+
+    @classmethod
+    def get_columnar_scan(cls) -> bool:
+        return cls._columnar_scan
+
+    @classmethod
+    def get_columnar_min_rows(cls) -> int:
+        return cls._columnar_min_rows
+
+    @classmethod
+    def get_dictionary_column_words(cls) -> int:
+        return cls._dictionary_column_words
+
+    @classmethod
+    def get_packed_columns(cls) -> bool:
+        return cls._packed_columns
+
+    @classmethod
+    def get_packed_min_rows(cls) -> int:
+        return cls._packed_min_rows
+
+    @classmethod
+    def get_compression(cls) -> str:
+        return cls._compression
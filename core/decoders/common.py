@@ -94,6 +94,9 @@ DATA_TYPES = (
     INTO,
     WHERE,
     SET,
+    WITH,
+    VACUUM,
+    RENUMBER,
 ) = map(
     pp.CaselessKeyword,
     [
@@ -116,6 +119,9 @@ DATA_TYPES = (
         "INTO",
         "WHERE",
         "SET",
+        "WITH",
+        "VACUUM",
+        "RENUMBER",
     ],
 )
 
@@ -139,6 +145,9 @@ KEYWORD = (
     | INTO
     | WHERE
     | SET
+    | WITH
+    | VACUUM
+    | RENUMBER
     | DATA_TYPES
 )
 KEYWORD.set_name("keyword")
@@ -169,8 +178,11 @@ STRING_LITERAL.set_name("string")
 LITERAL_VALUE = NUMERIC_LITERAL | STRING_LITERAL | NULL
 LITERAL_VALUE.set_name("value literal")
 
-VALUE_LIST = pp.Suppress(VALUES) + LPAREN + pp.delimited_list(LITERAL_VALUE) + RPAREN
-VALUE_LIST.set_name("list of column values")
+VALUE_ROW = pp.Group(LPAREN + pp.delimited_list(LITERAL_VALUE) + RPAREN)
+VALUE_ROW.set_name("list of column values")
+
+VALUE_LIST = pp.Suppress(VALUES) + pp.delimited_list(VALUE_ROW)
+VALUE_LIST.set_name("list of rows")
 
 # Primary Key and Other Definitions
 PRIMARY_KEY = pp.Group(PRIMARY + KEY).set_parse_action(lambda: "PRIMARY_KEY")
@@ -186,5 +198,16 @@ COLUMN_DEFINITION.set_parse_action(column_definition_semantics)
 MULTI_COLUMN_DEFINITIONS = LPAREN + pp.delimited_list(COLUMN_DEFINITION) + RPAREN
 NEW_TABLE_NAME = NEW_COL_NAME.copy()
 
+# Table Options
+PAGE_SIZE_OPTION = pp.Suppress(pp.CaselessKeyword("page_size")) + EQUAL + INTEGER
+PAGE_SIZE_OPTION.set_parse_action(lambda toks: ("page_size", int(toks[0])))
+COMPRESSION_OPTION = pp.Suppress(pp.CaselessKeyword("compression")) + EQUAL + (STRING_LITERAL | IDENTIFIER)
+COMPRESSION_OPTION.set_parse_action(lambda toks: ("compression", toks[0].lower()))
+TABLE_OPTIONS = (
+    pp.Suppress(WITH) + LPAREN + pp.delimited_list(PAGE_SIZE_OPTION | COMPRESSION_OPTION) + RPAREN
+)
+TABLE_OPTIONS.set_parse_action(lambda toks: {"table_options": dict(toks.as_list())})
+TABLE_OPTIONS.set_name("table options")
+
 COLUMN_LIST = LPAREN + pp.delimited_list(IDENTIFIER) + RPAREN
 COLUMN_LIST.set_name("paranthesized column name list")
@@ -1,4 +1,3 @@
-from core.config.config_manager import ConfigManager
 from core.decoders.handlers.base_handler import BaseHandler
 from core.decoders.handlers.update_index_handler import UpdateIndexHandler
 from core.elements.Index import Index
@@ -20,10 +19,15 @@ class CreateIndexHandler(BaseHandler):
         if not self.get_index(
             table_name, column_name, cache_tables, cache_indexes, creation_mode=True
         ):
+            table: Table = self.get_table(
+                table_name, cache_tables, cache_indexes, creation_mode=False
+            )
+            # Index pages are sized like the pages of their table.
             cache_indexes[table_name + "." + column_name] = Index.create_index(
                 {"table_name": table_name, "column_name": column_name},
-                page_size=ConfigManager.get_page_size(),
+                page_size=table.page_size,
             )
+            cache_indexes[table_name + "." + column_name].table = table
             self.update_index_handler.handle_command(
                 {
                     "table_name": table_name,
@@ -31,8 +35,5 @@ class CreateIndexHandler(BaseHandler):
                     "cache": parsed_tokens["cache"],
                 }
             )
-            table: Table = self.get_table(
-                table_name, cache_tables, cache_indexes, creation_mode=False
-            )
             table.indexes[column_name] = cache_indexes[table_name + "." + column_name]
         print(f"Created index {table_name}.{column_name}")
@@ -3,6 +3,7 @@ from core.decoders.handlers.base_handler import BaseHandler
 from core.decoders.sql_query_parser import SQLQueryParser
 from core.elements.Table import Table
 from core.elements.system_table import SystemTable
+from core.handlers.page_codec import page_codec
 
 
 class CreateTableHandler(BaseHandler):
@@ -13,6 +14,19 @@ class CreateTableHandler(BaseHandler):
         )
         table_name = parsed_tokens.get("table_name", "").lower()
         column_list = parsed_tokens.get("column_list", [])
+        table_options = parsed_tokens.get("table_options", {})
+        page_size = table_options.get("page_size", ConfigManager.get_page_size())
+        if page_size not in ConfigManager.get_page_sizes():
+            raise ValueError(
+                f"Page size {page_size} not one of {ConfigManager.get_page_sizes()}"
+            )
+        compression = table_options.get("compression", ConfigManager.get_compression())
+        if compression == "none":
+            compression = None
+        if compression is not None and compression not in page_codec.names():
+            raise ValueError(
+                f"Compression {compression} not one of {page_codec.names()}"
+            )
         cache_tables = parsed_tokens["cache"]["cache_tables"]
         cache_indexes = parsed_tokens["cache"]["cache_indexes"]
 
@@ -34,7 +48,8 @@ class CreateTableHandler(BaseHandler):
 
             cache_tables[table_name] = Table.create_table(
                 {"table_name": table_name, "column_list": column_list},
-                page_size=ConfigManager.get_page_size(),
+                page_size=page_size,
+                compression=compression,
             )
 
             print(f"Table {table_name} created.")
@@ -42,7 +57,7 @@ class CreateTableHandler(BaseHandler):
         if table_name not in {"system_tables", "system_columns"}:
             table_rec_count = cache_tables["system_tables"].id_row
             pdict = SystemTable.insert_table_data(
-                table_rec_count + 1, table_name, ConfigManager.get_page_size(), 0
+                table_rec_count + 1, table_name, page_size, 0
             )
             self.processor.router(pdict, cache_tables, cache_indexes)
 
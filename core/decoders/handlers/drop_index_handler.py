@@ -1,5 +1,6 @@
 import os
 from core.config.config_manager import ConfigManager
+from core.handlers.write_ahead_log import write_ahead_log
 
 from core.decoders.handlers.base_handler import BaseHandler
 from core.elements.Table import Table
@@ -22,6 +23,9 @@ class DropIndexHandler(BaseHandler):
             file_path = os.path.join(
                 exec_path, ConfigManager.get_data_dir(), f"{name}{ndx_ext}"
             )
+            # Fold pending pages in first, so a later checkpoint or
+            # recovery cannot bring the file back.
+            write_ahead_log.get().checkpoint()
             os.remove(file_path)
             del cache_indexes[name]
             table: Table = self.get_table(
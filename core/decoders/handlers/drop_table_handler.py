@@ -1,5 +1,6 @@
 import os
 from core.config.config_manager import ConfigManager
+from core.handlers.write_ahead_log import write_ahead_log
 
 from core.decoders.handlers.base_handler import BaseHandler
 from core.decoders.handlers.drop_index_handler import DropIndexHandler
@@ -26,6 +27,10 @@ class DropTableHandler(BaseHandler):
             file_path = os.path.join(
                 exec_path, ConfigManager.get_data_dir(), f"{table_name}{tbl_ext}"
             )
+            table_obj.close()
+            # Fold pending pages in first, so a later checkpoint or
+            # recovery cannot bring the file back.
+            write_ahead_log.get().checkpoint()
             os.remove(file_path)
             del cache_tables[table_name]
             del table_obj
@@ -11,18 +11,20 @@ class InsertRowHandler(BaseHandler):
     def handle_command(self, parsed_tokens):
         self.required_fields_check(
             parsed_tokens=parsed_tokens,
-            required_field=["table_name", "column_name_list", "cache", "value_list"],
+            required_field=["table_name", "column_name_list", "cache"],
         )
         table_name = parsed_tokens.get("table_name", "").lower()
         column_name_list = parsed_tokens.get("column_name_list", [])
-        value_list = parsed_tokens.get("value_list", [])
+        # Parsed statements carry one or more rows, statements built in
+        # code a single value_list.
+        value_rows = parsed_tokens.get("value_rows") or [parsed_tokens.get("value_list", [])]
         cache_tables = parsed_tokens["cache"]["cache_tables"]
         cache_indexes = parsed_tokens["cache"]["cache_indexes"]
 
         table_obj: Table = self.get_table(table_name, cache_tables, cache_indexes)
 
-        table_obj.insert(
-            {"column_name_list": column_name_list, "value_list": value_list}
+        table_obj.insert_many(
+            {"column_name_list": column_name_list, "value_rows": value_rows}
         )
 
         for column_name in table_obj.column_data["column_names"]:
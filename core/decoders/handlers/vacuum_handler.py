@@ -0,0 +1,45 @@
+from core.decoders.handlers.base_handler import BaseHandler
+from core.decoders.handlers.update_index_handler import UpdateIndexHandler
+from core.elements.Table import Table
+
+
+class VacuumHandler(BaseHandler):
+    def __init__(self, processor):
+        super().__init__(processor)
+        self.update_index_handler = UpdateIndexHandler(processor)
+
+    def handle_command(self, parsed_tokens):
+        self.required_fields_check(
+            parsed_tokens=parsed_tokens,
+            required_field=["table_name", "cache"],
+        )
+        table_name = parsed_tokens.get("table_name", "").lower()
+        renumber = parsed_tokens.get("renumber", False)
+        cache_tables = parsed_tokens["cache"]["cache_tables"]
+        cache_indexes = parsed_tokens["cache"]["cache_indexes"]
+
+        if table_name:
+            table_names = [table_name]
+            self.get_table(table_name, cache_tables, cache_indexes)
+        else:
+            table_names = list(cache_tables)
+
+        for name in table_names:
+            table_obj: Table = cache_tables[name]
+            # The row ids of the system tables are stored in their rowid
+            # columns, they keep them.
+            reclaimed = table_obj.vacuum(
+                renumber and name not in {"system_tables", "system_columns"}
+            )
+
+            for column_name in table_obj.column_data["column_names"]:
+                if column_name in table_obj.indexes:
+                    self.update_index_handler.handle_command(
+                        {
+                            "table_name": name,
+                            "column_name": column_name,
+                            "cache": parsed_tokens["cache"],
+                        }
+                    )
+
+            print(f"Table {name} vacuumed, {reclaimed} bytes reclaimed.")
@@ -9,6 +9,7 @@ from core.decoders.handlers.insert_row_handler import InsertRowHandler
 from core.decoders.handlers.select_row_handler import SelectRowsHandler
 from core.decoders.handlers.update_row_handler import UpdateRowHandler
 from core.decoders.handlers.create_index_handler import CreateIndexHandler
+from core.decoders.handlers.vacuum_handler import VacuumHandler
 
 
 class SQLCommandHandler:
@@ -22,6 +23,7 @@ class SQLCommandHandler:
             "DELETE": DeleteRowHandler(self),
             "UPDATE": UpdateRowHandler(self),
             "SELECT": SelectRowsHandler(self),
+            "VACUUM": VacuumHandler(self),
         }
 
     def router(self, parsed_tokens, in_memory_tables, in_memory_indexes: Dict):
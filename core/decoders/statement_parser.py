@@ -19,6 +19,9 @@ from core.decoders.common import (
     IDENTIFIER,
     SHOW,
     TABLES,
+    TABLE_OPTIONS,
+    VACUUM,
+    RENUMBER,
 )
 from core.decoders.clauses import SELECT_CLAUSE, SET_CLAUSE, WHERE_CLAUSE
 
@@ -29,6 +32,7 @@ class StatementParser:
             pp.Group(CREATE + TABLE).set_parse_action(lambda ls: " ".join(ls[0]))
             + NEW_TABLE_NAME
             + MULTI_COLUMN_DEFINITIONS
+            + pp.Opt(TABLE_OPTIONS)
             + STATEMENT_TERMINATOR
         ).set_parse_action(self.table_creation_semantics)
 
@@ -84,7 +88,7 @@ class StatementParser:
                 "command": plist[0],
                 "column_name_list": plist[1].as_list(),
                 "table_name": plist[2],
-                "value_list": plist[3].as_list(),
+                "value_rows": plist[3].as_list(),
             }
         )
 
@@ -132,6 +136,19 @@ class StatementParser:
             }
         )
 
+        self.vacuum_statement = (
+            VACUUM
+            + pp.Opt(IDENTIFIER, default="")
+            + pp.Opt(RENUMBER).set_parse_action(lambda plist: bool(plist))
+            + STATEMENT_TERMINATOR
+        ).set_parse_action(
+            lambda plist: {
+                "command": plist[0],
+                "table_name": plist[1],
+                "renumber": plist[2],
+            }
+        )
+
         self.show_table_statement = SHOW + TABLES + STATEMENT_TERMINATOR
         self.show_table_statement.set_parse_action(
             lambda: self.select_statement.parse_string(
@@ -149,6 +166,7 @@ class StatementParser:
             | self.update_record_statement
             | self.select_statement
             | self.show_table_statement
+            | self.vacuum_statement
         )
 
     def parse(self, query):
@@ -160,10 +178,18 @@ class StatementParser:
             cmd,
             t_name,
         ) = parse_list[0:2]
-        col_json_list = parse_list[2:]
+        col_json_list = [x for x in parse_list[2:] if "table_options" not in x]
+        table_options = {}
+        for x in parse_list[2:]:
+            table_options.update(x.get("table_options", {}))
         columns_list = []
         for i, col_json in enumerate(col_json_list):
             col_json["column_position"] = i + 1
             col_json["table_name"] = t_name
             columns_list.append(col_json)
-        return {"command": cmd, "table_name": t_name, "column_list": columns_list}
+        return {
+            "command": cmd,
+            "table_name": t_name,
+            "column_list": columns_list,
+            "table_options": table_options,
+        }
@@ -1,25 +1,30 @@
 from __future__ import annotations
-import io
 from typing import Any, Dict, List
 import numpy as np
 import math
+import time
 
+from core.config.config_manager import ConfigManager
+from core.elements.b_plus_node import b_plus_node
+from core.elements.b_plus_tree import b_plus_tree
 from core.elements.b_tree_node import b_tree_node
 from core.elements.b_tree import b_tree
-from core.elements.data_pointer import data_pointer
 from core.elements.page_header import page_header
 from core.elements.page_type import page_type
 from core.elements.record import record
 from core.elements.data_cell import data_cell
 from core.handlers.page_writer import page_writer
 from core.handlers.leaf_writer import leaf_writer
+from core.handlers.pager import pager
 
 class Index:
     def __init__(self, page_size = 512) -> None:
         self.col_data_keys = {"keys", "pointers"}
         page_space = page_size - 16
-        self.max_rec_size = math.floor(page_space/6) - 2
-        self.btree = b_tree()
+        # Same fan-out as the table the index belongs to, see Table.
+        self.min_degree = 3 * (page_size // 512)
+        self.max_rec_size = math.floor(page_space/(2 * self.min_degree)) - 2
+        self._btree = b_tree(self.min_degree)
         self.column_data = {
             "keys": [],
             "pointers": []
@@ -28,6 +33,57 @@ class Index:
         self.page_size = page_size
         self.name = ""
         self.recently_deleted = set()
+        self.dirty = True
+        self.file_path = None
+        self.log = None
+        # Table holding the overflow pages of spilled values in the index.
+        self.table = None
+        self.last_used = time.monotonic()
+
+    @property
+    def btree(self) -> b_tree:
+        # Indexes registered from the data directory read their file on
+        # first use.
+        if self._btree is None:
+            self.open()
+        self.last_used = time.monotonic()
+        return self._btree
+
+    @btree.setter
+    def btree(self, tree: b_tree) -> None:
+        self._btree = tree
+
+    def is_open(self) -> bool:
+        return self._btree is not None
+
+    @classmethod
+    def from_catalog(cls, file_path: str, page_size: int = 512, log = None) -> Index:
+        """
+        Register an index file without reading it, see Table.from_catalog.
+        """
+        new_index = cls(page_size)
+        new_index.file_path = file_path
+        new_index.log = log
+        new_index.btree = None
+        new_index.dirty = False
+        return new_index
+
+    def open(self) -> None:
+        pgr = pager.open(self.file_path, self.page_size, self.log)
+        # Coded values in the index are codes of its table's dictionary.
+        words = self.table.dictionary.words if self.table is not None else None
+        loaded, self.id_row = self.bytes_to_object(pgr.read_all(), self.page_size, words)
+        pgr.close()
+        for rec in loaded.btree.traverse(loaded.btree.root):
+            for ref in rec.spilled():
+                ref.bind(self.table)
+        self.btree = loaded.btree
+
+    def release(self) -> bool:
+        if self.file_path is None or self.dirty or not self.is_open():
+            return False
+        self._btree = None
+        return True
 
     @classmethod
     def create_index(cls, create_op: Dict, page_size=512) -> Index:
@@ -44,7 +100,6 @@ class Index:
             "column_name_list": [column_name],
             "condition" : ""
         }
-        current_leaf = table.first_record()
         col_ord_list = table.get_order_column_name_list(selection_dict["column_name_list"])
         condition = selection_dict["condition"]
         
@@ -55,12 +110,16 @@ class Index:
             table.validate_conditions(condition)
 
 
+        # Leaves are scanned in row id order, so the entries arrive sorted
+        # and the tree is bulk loaded once at the end.
+        rows = []
         self.id_row = 0
-        while current_leaf:
-            record_refs = [key.data for key in current_leaf.keys if key.id not in table.recently_deleted]
+        for current_leaf in table.scan_leaves():
+            record_refs = [key for key in current_leaf.keys if key.id not in table.recently_deleted]
              
             keys =  [key.id for key in current_leaf.keys if key.id not in table.recently_deleted]
-            sels = sum(record.filter_subset(record_refs, col_ord_list, condition),[])
+            # Spilled values stay references to the table's overflow pages.
+            sels = sum(record.filter_subset(record_refs, col_ord_list, condition, resolve=False),[])
 
             for (i,k) in zip(sels,keys):
                 index_record = record(
@@ -71,12 +130,13 @@ class Index:
                     )
                 
 
-                dp = data_pointer[record](record.get_id, index_record)
-                self.btree.insert(dp)
+                rows.append(index_record)
                 self.id_row +=1
 
-
-            current_leaf = current_leaf.next
+        self.btree = b_tree.bulk_load(
+            rows, ConfigManager.get_bulk_fill_factor(), self.min_degree
+        )
+        self.dirty = True
 
 
     @classmethod
@@ -86,44 +146,47 @@ class Index:
 
     @classmethod
     def bytes_to_object(cls, byte_stream: bytes, 
-                         page_size: int = 512) -> Index:
+                         page_size: int = 512, words: List[str] = None) -> Index:
 
-        raw = io.BytesIO(byte_stream)
-        read_buff = io.BufferedRandom(raw)
+        # Pages are sliced out of one memoryview, so a mapped file is
+        # walked without copying it
+        pages = memoryview(byte_stream)
+        rows: List[record] = []
 
-        page_n = read_buff.read(page_size)
-        page_num = 0
-        dps: List[data_pointer] = []
+        for page_num, start in enumerate(range(0, len(pages) - page_size + 1, page_size)):
+            page_n = pages[start:start + page_size]
 
-        while page_n:
-            pagetype = cls.bytes_to_int(page_n[:1])
-
-            if pagetype == 13:
-                node = leaf_writer.bytes_to_object(page_n, page_num)
+            if page_n[0] == 13:
+                node = leaf_writer.bytes_to_object(page_n, page_num, words)
                 leaf = node.to_bnode()
-                dps.extend(leaf.keys)
-            else:
-                pass
-
-            page_num+=1
-            page_n = read_buff.read(page_size)
+                rows.extend(leaf.keys)
 
         new_index = cls(page_size=page_size)
-            
-        dps.sort(key=data_pointer.get_id)
-        for dp in dps:
-            new_index.btree.insert(dp)
-     
 
-        return new_index,len(dps)
+        rows.sort(key=record.get_id)
+        new_index.btree = b_tree.bulk_load(
+            rows, ConfigManager.get_bulk_fill_factor(), new_index.min_degree
+        )
+        new_index.dirty = False
 
-    def object_to_bytes(self) -> bytes:
+        return new_index,len(rows)
 
-        page_list = []
-
-        self.tree_to_binary(self.btree.root, 0, 0xFFFFFFFF, page_list)
-
-        return b"".join(reversed(page_list))
+    def object_to_bytes(self) -> bytes:
+        # Interior b_tree nodes hold records too, while interior pages only
+        # hold row ids. The records are laid out in order as the leaves of a
+        # bulk loaded b_plus_tree instead, so every one of them is written.
+        layout = b_plus_tree.bulk_load(
+            self.btree.traverse(self.btree.root),
+            ConfigManager.get_bulk_fill_factor(),
+            self.min_degree,
+        )
+
+        # Pages are numbered in preorder and encoded in place into one
+        # buffer for the whole file.
+        pages = bytearray(_count_nodes(layout.root) * self.page_size)
+        self.tree_to_binary(layout.root, 0, 0xFFFFFFFF, memoryview(pages))
+
+        return pages
 
     @classmethod
     def int_object_to_bytes(cls,int_like_val: Any, size: int):
@@ -142,7 +205,7 @@ class Index:
     def bytes_to_int(cls,byte_st: bytes):
         return int.from_bytes(byte_st, "big")
 
-    def tree_to_binary(self, node: b_tree_node, page_num: int, parent_page_num: int, page_bytes_list: list, right_relative: int = 0):
+    def tree_to_binary(self, node: b_plus_node, page_num: int, parent_page_num: int, pages: memoryview, right_relative: int = 0):
         if node.is_leaf:
         
             head = page_header(
@@ -156,11 +219,11 @@ class Index:
             writer = leaf_writer(
                 page_number=page_num,
                 header=head,
-                records=[rec.data for rec in node.keys],
+                records=node.keys,
                 page_size=self.page_size
             )
 
-            page_bytes_list.append(writer.object_to_bytes())
+            writer.into(pages[page_num * self.page_size:(page_num + 1) * self.page_size])
             return page_num + 1
 
         else:
@@ -173,9 +236,9 @@ class Index:
             for i, child in enumerate(node.pointers):
                 this_cc_page_num.append(cc_page_num)
                 if i == n_children-1:
-                    cc_page_num = self.tree_to_binary(child, cc_page_num, this_page_num, page_bytes_list, 0)
+                    cc_page_num = self.tree_to_binary(child, cc_page_num, this_page_num, pages, 0)
                 else:
-                    cc_page_num = self.tree_to_binary(child, cc_page_num, this_page_num, page_bytes_list, cc_page_num+1)
+                    cc_page_num = self.tree_to_binary(child, cc_page_num, this_page_num, pages, cc_page_num+1)
 
             head = page_header(
                 page_type.table_interior_page,
@@ -186,8 +249,7 @@ class Index:
             )
 
             r_cells =[]
-            for pno, dip in zip(this_cc_page_num[:-1], node.keys):
-                rid = dip.get_id()
+            for pno, rid in zip(this_cc_page_num[:-1], node.keys):
                 r_cells.append(data_cell(rid, pno))
 
             writer = page_writer(
@@ -199,20 +261,33 @@ class Index:
                 self.page_size
             )
 
-            page_bytes_list.append(writer.object_to_bytes(parent_page_num))
+            writer.into(
+                pages[this_page_num * self.page_size:(this_page_num + 1) * self.page_size],
+                parent_page_num
+            )
                 
             return cc_page_num
 
+    def matching_ids(self, condition: Dict) -> List[int]:
+        index_condition = dict(condition, column_order=0)
+        filter_ = record.apply_filter(index_condition)
+        return [rec.id for rec in self.btree.traverse(self.btree.root) if filter_(rec)]
+
     def first_record(self) -> b_tree_node:
-        for uid in range(self.id_row):
-            if uid not in self.recently_deleted:
-                node, idx = self.btree.search(self.btree.root, uid)
-                if node and idx is not None:
-                    return node
+        # The node holding the smallest row id is the leftmost leaf.
+        node = self.btree.root
+        while not node.is_leaf:
+            node = node.pointers[0]
 
-        return None
+        return node if node.keys else None
 
   
-    
+
+def _count_nodes(node: b_plus_node) -> int:
+    if node.is_leaf:
+        return 1
+    return 1 + sum(map(_count_nodes, node.pointers))
+
+
 if __name__ == '__main__':
     pass
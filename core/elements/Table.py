@@ -1,47 +1,97 @@
 from __future__ import annotations
 import datetime as dt
-import io
+import time
+from bisect import bisect_right
 import traceback
 from typing import Any, Dict, List
 import numpy as np
 import math
+from core.config.config_manager import ConfigManager
 from core.elements.b_plus_node import b_plus_node
 from core.elements.b_plus_tree import b_plus_tree
-from core.elements.data_pointer import data_pointer
+from core.elements.column_store import column_store
 from core.elements.data_type import data_type
 from core.elements.Index import Index
+from core.elements.packed_columns import packed_columns
 from core.elements.page_header import page_header
 from core.elements.page_type import page_type
 from core.elements.data_cell import data_cell
-from core.elements.record import record
+from core.elements.record import native, record
+from core.elements.overflow_text import overflow_text
+from core.elements.text_dictionary import text_dictionary
 from core.handlers.page_writer import page_writer
 from core.handlers.leaf_writer import leaf_writer
+from core.handlers.overflow_writer import overflow_writer
+from core.handlers.dictionary_writer import dictionary_writer
+from core.handlers.buffer_pool import buffer_pool
+from core.handlers.pager import pager
 
 class Table:
 
     def __init__(self, page_size = 512) -> None:
         self.col_data_keys = {"column_names", "data_types", "is_nullable", "column_key_types"}
         self.indexes = {}
-        page_space = page_size - 16
-        self.max_rec_size = math.floor(page_space/6) - 2
-
-        self.bptree = b_plus_tree()
         self.column_data = {
             "column_names": [],
             "data_types": [],
             "is_nullable": [],
             "column_key_types": []
         }
-        self.id_row = 0
-        self.data_pointers = []
         self.page_size = page_size
+        self._bptree = None
+        self.size_nodes()
+
+        self._bptree = b_plus_tree(self.min_degree, self.leaf_degree)
+        self._dictionary = text_dictionary()
+        self.id_row = 0
         self.name = ""
         self.recently_deleted = set()
+        self.dirty = True
+        self.saved_id_row = None
+        self.pager = None
+        self.page_count = 0
+        self.free_pages = []
+        self.freed_overflow = []
+        self.flushed_root = None
+        self.rewrite_all = True
+        self.file_path = None
+        self.log = None
+        # Codec the table's file is compressed with, see compressed_pager.
+        self.compression = None
+        self.last_used = time.monotonic()
+        # Columnar mirror of the rows, see mirror().
+        self.column_mirror = None
+        self.scanned_clean = False
+        self.mirrorable = True
+
+    @property
+    def bptree(self) -> b_plus_tree:
+        # Tables registered from the catalog open their file on first use.
+        if self._bptree is None:
+            self.open()
+        self.last_used = time.monotonic()
+        return self._bptree
+
+    @bptree.setter
+    def bptree(self, tree: b_plus_tree) -> None:
+        self._bptree = tree
+        self.drop_mirror()
+
+    @property
+    def dictionary(self) -> text_dictionary:
+        # Read from the table's file along with its tree.
+        if self._bptree is None:
+            self.open()
+        return self._dictionary
+
+    def is_open(self) -> bool:
+        return self._bptree is not None
 
     @classmethod
-    def create_table(cls, create_op: Dict, page_size=512) -> Table:
+    def create_table(cls, create_op: Dict, page_size=512, compression=None) -> Table:
 
         new_table = cls(page_size)
+        new_table.compression = compression
 
         col_list: List = create_op["column_list"]
         col_list.sort(key=lambda x: x.get("column_position", 0))
@@ -76,46 +126,133 @@ class Table:
                 column_data["data_types"] = list(map(data_type.from_type_name, column_data["data_types"])) 
             self.id_row = id_row
             self.name = name
+            self.size_nodes()
 
         else:
             print("Update failed due to missing column data!")
 
+    def size_nodes(self) -> None:
+        """
+        Derive the degrees of the tree from the page size and the width of
+        the rows, so that a full node, or two nodes merged on delete, fills
+        at most one page. Interior pages hold fixed size router cells. Rows
+        whose columns all have a fixed width have a known largest cell, and
+        leaves hold as many of them as fit. Rows with TEXT values have no
+        largest cell, their leaves keep holding five rows per 512 bytes of
+        page and longer values are spilled down to max_rec_size.
+        """
+        page_space = self.page_size - 16
+        routers = page_space // (data_cell.CELL_FORMAT.size + page_writer.OFFSET_FORMAT.size)
+        self.min_degree = max(3, (routers - 1) // 2)
+
+        d_types = self.column_data["data_types"]
+        if d_types and all(d_type.value[0] != "TEXT" for d_type in d_types):
+            widest = record.CELL_HEAD_FORMAT.size + len(d_types) + sum(d.value[2] for d in d_types)
+            self.leaf_degree = max(3, page_space // (widest + leaf_writer.OFFSET_FORMAT.size) // 2)
+        else:
+            self.leaf_degree = 3 * (self.page_size // 512)
+        self.max_rec_size = math.floor(page_space/(2 * self.leaf_degree)) - 2
+
+        if self._bptree is not None:
+            self._bptree.min_degree = self.min_degree
+            self._bptree.leaf_degree = self.leaf_degree
+
     @classmethod
     def from_table_file(cls, file_path: str) -> Table:
         byte_stream = cls.read_table(file_path)
         return cls.bytes_to_object(byte_stream)
 
+    @classmethod
+    def from_pager(cls, pgr: pager, page_size: int = 512, rec_count: int = 0,
+                   cdata: Dict = {}, name: str = "", update = True) -> Table:
+
+        new_table = cls(page_size=page_size)
+        new_table.pager = pgr
+        new_table.load_pages()
+
+        if update:
+            new_table.table_data(
+                cdata,
+                rec_count,
+                name
+            )
+
+        new_table.mark_clean()
+
+        return new_table
+
+    @classmethod
+    def from_catalog(cls, file_path: str, page_size: int = 512, rec_count: int = 0,
+                     cdata: Dict = {}, name: str = "", log = None) -> Table:
+        """
+        Register a table from its catalog entry without reading its file.
+        The file is opened the first time the table's tree is used, and can
+        be let go again with release() while the table is clean.
+        """
+        new_table = cls(page_size=page_size)
+        new_table.file_path = file_path
+        new_table.log = log
+        new_table.bptree = None
+        new_table.table_data(cdata, rec_count, name)
+        new_table.mark_clean()
+
+        return new_table
+
+    def open(self) -> None:
+        self.pager = pager.open(self.file_path, self.page_size, self.log)
+        self.load_pages()
+
+    def release(self) -> bool:
+        """
+        Drop the tree and file handle of a clean table registered from the
+        catalog, it is read back from its file on next use.
+        """
+        if self.file_path is None or self.dirty or not self.is_open():
+            return False
+        self.close()
+        self._bptree = None
+        self._dictionary = None
+        self.drop_mirror()
+        return True
+
+    def load_pages(self) -> None:
+        if self.pager.codec is not None:
+            self.compression = self.pager.codec.name
+        if not self.load_tree():
+            # Files that predate stable page numbers: collect every leaf and
+            # rebuild, the next flush lays the file out again from scratch.
+            legacy = self.bytes_to_object(self.pager.read_all(), self.page_size, update=False)
+            self._dictionary = text_dictionary()
+            self.bptree = legacy.bptree
+            self.size_nodes()
+            for current_leaf in self.scan_leaves():
+                for key in current_leaf.keys:
+                    for ref in key.spilled():
+                        ref.bind(self)
+            self.page_count = 0
+            self.free_pages = []
+            self.flushed_root = None
+            self.rewrite_all = True
+
     @classmethod
     def bytes_to_object(self, byte_stream: bytes, 
                          page_size: int = 512, rec_count: int = 0, 
                          cdata: Dict = {}, name: str = "", update = True) -> Table:
 
-        raw = io.BytesIO(byte_stream)
-        read_buff = io.BufferedRandom(raw)
-
+        # Pages are sliced out of one memoryview, so a mapped file is
+        # walked without copying it
+        pages = memoryview(byte_stream)
+        rows: List[record] = []
 
-        page_n = read_buff.read(page_size)
-        page_num = 0
-        dps: List[data_pointer] = []
+        for page_num, start in enumerate(range(0, len(pages) - page_size + 1, page_size)):
+            page_n = pages[start:start + page_size]
 
-        while page_n:
-            pagetype = self.bytes_to_int(page_n[:1])
-
-            if pagetype == 13:
+            if page_n[0] == 13:
                 node = leaf_writer.bytes_to_object(page_n, page_num)
                 leaf = node.to_bpnode()
-                dps.extend(leaf.keys)
-            else:
-                pass
-
-            page_num+=1
-            page_n = read_buff.read(page_size)
+                rows.extend(leaf.keys)
 
         new_table = self(page_size=page_size)
-            
-        dps.sort(key=data_pointer.get_id)
-        for dp in dps:
-            new_table.bptree.insert(dp)
 
         if update:
             new_table.table_data(
@@ -124,95 +261,451 @@ class Table:
                 name
             )
 
-        new_table.data_pointers = dps
+        rows.sort(key=record.get_id)
+        new_table.bptree = b_plus_tree.bulk_load(
+            rows, ConfigManager.get_bulk_fill_factor(), new_table.min_degree, new_table.leaf_degree
+        )
+
+        new_table.mark_clean()
 
         return new_table
 
-    def object_to_bytes(self) -> bytes:
+    def load_tree(self) -> bool:
+        """
+        Rebuild the b_plus_tree from the page structure rooted at page 0,
+        keeping every node on the page it was read from. Only interior pages
+        are decoded, leaves start out evicted and are read on first access.
+
+        Returns False when the file does not hold a consistent tree (empty,
+        or written before pages had stable numbers).
+        """
+        n_pages = self.pager.num_pages()
+        if n_pages == 0:
+            return False
+
+        visited = set()
+        leaves = []
+
+        def load(page_num: int, parent: b_plus_node, lo: int, hi: int) -> b_plus_node:
+            if not 0 <= page_num < n_pages or page_num in visited:
+                raise ValueError(f"Page {page_num} referenced twice or out of range")
+            visited.add(page_num)
+            page_n = self.pager.read_page(page_num)
+            pagetype = page_n[0]
+
+            if pagetype == page_type.table_leaf_page:
+                bounds = leaf_writer.bounding_ids(page_n)
+                if bounds and ((lo is not None and bounds[0] < lo)
+                               or (hi is not None and bounds[1] >= hi)):
+                    raise ValueError(f"Page {page_num} holds keys outside its range")
+                node = b_plus_node(True, parent)
+                node.owner = self
+                node.evict()
+                leaves.append(node)
+
+            elif pagetype == page_type.table_interior_page:
+                interior = page_writer.bytes_to_object(page_n, page_num)
+                node = b_plus_node(False, parent)
+                node.keys = [int(cell.row_id_val) for cell in interior.keys]
+                children = [int(cell.lc_page_number) for cell in interior.keys]
+                children.append(int(interior.last_child_pg))
+                bounds = [lo] + node.keys + [hi]
+                node.pointers = [
+                    load(child, node, bounds[i], bounds[i + 1])
+                    for i, child in enumerate(children)
+                ]
 
-        page_list = []
+            else:
+                raise ValueError(f"Page {page_num} is not a table page")
 
-        self.tree_to_binary(self.bptree.root, 0, 0xFFFFFFFF, page_list)
+            node.page_num = page_num
+            return node
 
-        return b"".join(reversed(page_list))
+        try:
+            root = load(0, None, None, None)
+        except (ValueError, IndexError, RecursionError):
+            return False
+
+        for left, right in zip(leaves, leaves[1:]):
+            left.next = right
+            right.prev = left
+
+        self.bptree = b_plus_tree(self.min_degree, self.leaf_degree)
+        self.bptree.root = root
+        self.bptree.head = leaves[0]
+        self.bptree.tail = leaves[-1]
+        self.page_count = n_pages
+        # Pages outside the tree are free, unless they hold overflow chains
+        # or the dictionary.
+        outside = {
+            page_num: self.pager.read_page(page_num)[0]
+            for page_num in set(range(n_pages)) - visited
+        }
+        self._dictionary = self.load_dictionary(
+            [page_num for page_num, kind in outside.items() if kind == page_type.dictionary_page]
+        )
+        in_use = set(self._dictionary.pages)
+        self.free_pages = sorted(
+            (page_num for page_num, kind in outside.items()
+             if kind != page_type.overflow_page and page_num not in in_use),
+            reverse=True,
+        )
+        self.flushed_root = root
+        self.rewrite_all = False
 
-    @classmethod
-    def int_object_to_bytes(cls,int_like_val: Any, size: int):
+        return True
 
-        try:
-            int_like_val.tobytes(">")
-        except Exception:
-            pass
-        finally:
-            if int_like_val >= 0:
-                return int(int_like_val).to_bytes(size, "big")
+    def load_leaf(self, node: b_plus_node) -> None:
+        page_n = self.pager.read_page(node.page_num)
+        node.keys = leaf_writer.bytes_to_object(
+            page_n, node.page_num, self._dictionary.words
+        ).to_bpnode().keys
+        for key in node.keys:
+            for ref in key.spilled():
+                ref.bind(self)
+        buffer_pool.get().admit(node, self)
+
+    def can_evict(self, node: b_plus_node) -> bool:
+        return (not self.rewrite_all
+                and node.page_num is not None
+                and node not in self.bptree.dirty_nodes)
+
+    def allocate_page(self) -> int:
+        if self.free_pages:
+            return self.free_pages.pop()
+
+        self.page_count += 1
+        return self.page_count - 1
+
+    def flush(self) -> int:
+        """
+        Write the pages of every node changed since the last flush through
+        self.pager, at their stable page numbers. Nodes keep their page for
+        their whole life, the root always lives in page 0 and pages of nodes
+        that were merged away are zeroed and reused.
+
+        Returns the number of pages written.
+        """
+        tree = self.bptree
+
+        if self.rewrite_all:
+            # Chains are laid out again with everything else, read the
+            # spilled values back before their pages are reused.
+            stack = [tree.root]
+            while stack:
+                node = stack.pop()
+                stack.extend(node.pointers)
+                for key in node.keys if node.is_leaf else []:
+                    for ref in key.spilled():
+                        if ref.is_written():
+                            ref.text, ref.first_page = ref.value, None
+            self.freed_overflow = []
+            self.dictionary.pages = []
+            self.dictionary.flushed = 0
+
+            self.page_count = 0
+            self.free_pages = []
+            self.flushed_root = None
+            stack = [tree.root]
+            while stack:
+                node = stack.pop()
+                node.page_num = None
+                tree.dirty_nodes.add(node)
+                stack.extend(node.pointers)
+            tree.freed_nodes = []
+
+        freed_pages = set(self.freed_overflow)
+        self.freed_overflow = []
+        for node in tree.freed_nodes:
+            if node.page_num is not None:
+                freed_pages.add(node.page_num)
+                node.page_num = None
+
+        renumbered = []
+
+        if tree.root is not self.flushed_root:
+            # Read the new root's keys in before it takes over page 0.
+            tree.root.keys
+            if self.flushed_root is not None and self.flushed_root.page_num == 0:
+                self.flushed_root.page_num = None
+                tree.dirty_nodes.add(self.flushed_root)
+            if tree.root.page_num is not None:
+                freed_pages.add(tree.root.page_num)
+            freed_pages.discard(0)
+            if 0 in self.free_pages:
+                self.free_pages.remove(0)
+            if self.page_count == 0:
+                self.page_count = 1
+            tree.root.page_num = 0
+            renumbered.append(tree.root)
+
+        self.free_pages.extend(sorted(freed_pages, reverse=True))
+
+        for node in tree.dirty_nodes:
+            if node.page_num is None:
+                node.page_num = self.allocate_page()
+                renumbered.append(node)
+
+        # Pages that point at a node by number must follow it when it moves.
+        for node in renumbered:
+            tree.mark_dirty(node.parent)
+            if node.is_leaf:
+                tree.mark_dirty(node.prev)
             else:
-                return int(int_like_val).to_bytes(size, "big", signed=True)
-                
-    @classmethod
-    def bytes_to_int(cls,byte_st: bytes):
-        return int.from_bytes(byte_st, "big")
+                tree.mark_dirty(*node.pointers)
+
+        freed_pages.difference_update(self.write_dictionary())
+
+        # Values spilled since the last flush get their chains before the
+        # leaves referencing them are written.
+        for node in tree.dirty_nodes:
+            for key in node.keys if node.is_leaf else []:
+                for ref in key.spilled():
+                    if not ref.is_written():
+                        freed_pages.difference_update(self.write_overflow(ref))
+                        # The cell was sized with a placeholder page.
+                        key.invalidate()
+
+        # Every page is encoded into the same buffer, the pager copies it.
+        page = bytearray(self.page_size)
+        for node in tree.dirty_nodes:
+            self.pager.write_page(node.page_num, self.node_to_page(node, page))
+            freed_pages.discard(node.page_num)
+
+        for page_num in freed_pages:
+            if page_num < self.page_count:
+                self.pager.free_page(page_num)
+
+        while self.page_count and self.page_count - 1 in self.free_pages:
+            self.free_pages.remove(self.page_count - 1)
+            self.page_count -= 1
+        self.pager.truncate(self.page_count)
+
+        written = len(tree.dirty_nodes)
+        written_leaves = [node for node in tree.dirty_nodes if node.is_leaf]
+        tree.dirty_nodes = set()
+        tree.freed_nodes = []
+        self.flushed_root = tree.root
+        self.rewrite_all = False
+
+        pool = buffer_pool.get()
+        for node in written_leaves:
+            node.owner = self
+            pool.admit(node, self)
+
+        return written
+
+    def node_to_page(self, node: b_plus_node, buffer: bytearray) -> memoryview:
+        # Encoded into buffer, see leaf_writer.into.
+        parent_page_num = node.parent.page_num if node.parent else 0xFFFFFFFF
 
-    def tree_to_binary(self, node: b_plus_node, page_num: int, parent_page_num: int, page_bytes_list: list, right_relative: int = 0):
         if node.is_leaf:
-        
             head = page_header(
                 page_type.table_leaf_page,
                 num_cells=0,
                 data_start=0,
-                right_relatve=right_relative,
+                right_relatve=node.next.page_num if node.next else 0,
                 parent=parent_page_num
             )
 
             writer = leaf_writer(
-                page_number=page_num,
+                page_number=node.page_num,
                 header=head,
-                records=[rec.data for rec in node.keys],
-                page_size=self.page_size
+                records=node.keys,
+                page_size=self.page_size,
+                pack=ConfigManager.get_packed_columns()
             )
 
-            page_bytes_list.append(writer.object_to_bytes())
-            return page_num + 1
-
-        else:
+            return writer.into(buffer)
 
-            n_children = len(node.pointers)
-            this_page_num = page_num
-            cc_page_num = this_page_num + 1
-            this_cc_page_num = []
+        last_child_pg = node.pointers[-1].page_num
+        head = page_header(
+            page_type.table_interior_page,
+            0,
+            0,
+            last_child_pg,
+            parent_page_num
+        )
 
-            for i, child in enumerate(node.pointers):
-                this_cc_page_num.append(cc_page_num)
-                if i == n_children-1:
-                    cc_page_num = self.tree_to_binary(child, cc_page_num, this_page_num, page_bytes_list, 0)
-                else:
-                    cc_page_num = self.tree_to_binary(child, cc_page_num, this_page_num, page_bytes_list, cc_page_num+1)
+        r_cells = []
+        for child, rid in zip(node.pointers[:-1], node.keys):
+            r_cells.append(data_cell(rid, child.page_num))
+
+        writer = page_writer(
+            node.page_num,
+            head,
+            [],
+            r_cells,
+            last_child_pg,
+            self.page_size
+        )
 
-            head = page_header(
-                page_type.table_interior_page,
-                0,
-                0,
-                this_cc_page_num[-1],
-                parent_page_num
+        return writer.into(buffer, parent_page_num)
+
+    def write_overflow(self, ref: overflow_text) -> List[int]:
+        """
+        Write a spilled value to a chain of newly allocated overflow pages
+        and point ref at its first page.
+
+        Returns the page numbers of the chain.
+        """
+        data = ref.text.encode()
+        capacity = overflow_writer.capacity(self.page_size)
+        chunks = [data[i:i + capacity] for i in range(0, len(data), capacity)] or [b""]
+        page_nums = [self.allocate_page() for _ in chunks]
+
+        for page_num, next_page, chunk in zip(
+            page_nums, page_nums[1:] + [overflow_writer.NO_PAGE], chunks
+        ):
+            writer = overflow_writer(page_num, next_page, chunk, self.page_size)
+            self.pager.write_page(page_num, writer.object_to_bytes())
+
+        ref.bind(self, page_nums[0])
+        return page_nums
+
+    def write_dictionary(self) -> List[int]:
+        """
+        Write the values added to the dictionary since the last flush: its
+        last page is written again and new pages are chained after it.
+
+        Returns the page numbers written.
+        """
+        dictionary = self.dictionary
+        if dictionary.is_flushed():
+            return []
+
+        entries = dictionary.entries()
+        starts = dictionary_writer.pack(entries, self.page_size)
+        while len(dictionary.pages) < len(starts):
+            dictionary.pages.append(self.allocate_page())
+
+        ends = starts[1:] + [len(entries)]
+        next_pages = dictionary.pages[1:] + [dictionary_writer.NO_PAGE]
+        written = []
+        # The page holding the last value written gets its next link.
+        first = max(bisect_right(starts, dictionary.flushed - 1) - 1, 0)
+        for i in range(first, len(starts)):
+            writer = dictionary_writer(
+                dictionary.pages[i], next_pages[i], entries[starts[i]:ends[i]], self.page_size
             )
+            self.pager.write_page(dictionary.pages[i], writer.object_to_bytes())
+            written.append(dictionary.pages[i])
+
+        dictionary.flushed = len(entries)
+        return written
+
+    def load_dictionary(self, page_nums: List[int]) -> text_dictionary:
+        """
+        Read the dictionary back from its chain, among page_nums: the
+        dictionary pages found outside the tree.
+        """
+        chain = {
+            page_num: dictionary_writer.bytes_to_object(self.pager.read_page(page_num), page_num)
+            for page_num in page_nums
+        }
+        heads = set(chain) - {page.next_page for page in chain.values()}
+
+        entries, pages = [], []
+        page_num = min(heads) if heads else dictionary_writer.NO_PAGE
+        while page_num in chain and page_num not in pages:
+            pages.append(page_num)
+            entries.extend(chain[page_num].entries)
+            page_num = chain[page_num].next_page
+
+        return text_dictionary.from_entries(entries, pages)
+
+    def intern_text(self, values: List[Any]) -> List[Any]:
+        # TEXT values of a row as it keeps them, see text_dictionary.intern.
+        return [
+            self.dictionary.intern(i, v) if typ is data_type.TEXT else v
+            for i, (v, typ) in enumerate(zip(values, self.column_data["data_types"]))
+        ]
+
+    def read_overflow(self, first_page: int, length: int) -> str:
+        if not self.is_open():
+            self.open()
+
+        chunks = []
+        for page_num in self.overflow_chain(first_page):
+            page_n = self.pager.read_page(page_num)
+            chunks.append(overflow_writer.bytes_to_object(page_n, page_num).payload)
+
+        return b"".join(chunks)[:length].decode()
+
+    def overflow_chain(self, first_page: int):
+        page_num = first_page
+        for _ in range(self.pager.num_pages()):
+            if page_num == overflow_writer.NO_PAGE:
+                return
+            yield page_num
+            page_num = overflow_writer.next_page_of(self.pager.read_page(page_num))
+
+    def free_overflow(self, refs) -> None:
+        # Pages go back to the free list at the next flush.
+        for ref in refs:
+            if ref.is_written():
+                self.freed_overflow.extend(self.overflow_chain(ref.first_page))
+
+    def fit_record(self, rec: record) -> bool:
+        """
+        Spill the longest TEXT values of rec to overflow pages, one at a
+        time, until its cell fits in max_rec_size.
+
+        Returns False when the record is still too large with every TEXT
+        value spilled.
+        """
+        # Coded values take two bytes in the cell, spilling them gains nothing.
+        texts = sorted(
+            ((len(v.encode()), i) for i, v in enumerate(rec.data_values) if type(v) is str),
+            reverse=True,
+        )
+        for n_bytes, i in texts:
+            # Values longer than a cell never stay inline, the rest only
+            # while the record is too large.
+            if n_bytes <= self.max_rec_size and self.validate_record(rec):
+                return True
+            rec.data_values[i] = overflow_text(rec.data_values[i])
+            rec.invalidate()
+
+        return self.validate_record(rec)
+
+    def apply_update(self, rec: record, update_) -> record:
+        spilled = rec.spilled()
+        update_(rec)
+        rec.data_values = self.intern_text(rec.data_values)
+        # Spilled values replaced by the update lose their chains.
+        self.free_overflow(
+            ref for ref in spilled if all(v is not ref for v in rec.data_values)
+        )
 
-            r_cells =[]
-            for pno, rid in zip(this_cc_page_num[:-1], node.keys):
-                r_cells.append(data_cell(rid, pno))
-
-            writer = page_writer(
-                this_page_num,
-                head,
-                [],
-                r_cells,
-                this_cc_page_num[-1],
-                self.page_size
-            )
+        if not self.fit_record(rec):
+            raise OverflowError(f"Record {rec.data_values} exceeds maximum"
+                                f" possible record byte size {self.max_rec_size}")
+        return rec
+
+    def close(self) -> None:
+        buffer_pool.get().forget(self)
+        if self.pager is not None:
+            self.pager.close()
+            self.pager = None
+
+    @classmethod
+    def int_object_to_bytes(cls,int_like_val: Any, size: int):
 
-            page_bytes_list.append(writer.object_to_bytes(parent_page_num))
+        try:
+            int_like_val.tobytes(">")
+        except Exception:
+            pass
+        finally:
+            if int_like_val >= 0:
+                return int(int_like_val).to_bytes(size, "big")
+            else:
+                return int(int_like_val).to_bytes(size, "big", signed=True)
                 
-            return cc_page_num
-          
+    @classmethod
+    def bytes_to_int(cls,byte_st: bytes):
+        return int.from_bytes(byte_st, "big")
+
     @staticmethod
     def read_table(tfile: str):
         fb = None
@@ -222,46 +715,69 @@ class Table:
         return fb
 
     def insert(self, insert_dict: Dict) -> int:
-
+        return self.insert_many({
+            "column_name_list": insert_dict["column_name_list"],
+            "value_rows": [insert_dict["value_list"]],
+        })
+
+    def insert_many(self, insert_dict: Dict) -> int:
+        """
+        Insert every row of insert_dict["value_rows"], all of them or none
+        when one breaks a constraint. Uniqueness is checked for the whole
+        batch at once, with one scan of each unique column, and the rows
+        are appended to the rightmost leaf since their ids are new.
+
+        Returns the row count after the insert.
+        """
         insert_dict["col_ord_list"] = self.get_order_column_name_list(insert_dict["column_name_list"])
-        insertion_values = []
         all_columns = self.get_order_column_name_list()
+        rows = []
 
-        for i in all_columns:
-            if i in insert_dict["col_ord_list"]:
-                insertion_values.append(insert_dict["value_list"][i])
-            else:
-                insertion_values.append(b"")
+        for value_list in insert_dict["value_rows"]:
+            insertion_values = []
+            for i in all_columns:
+                if i in insert_dict["col_ord_list"]:
+                    insertion_values.append(value_list[i])
+                else:
+                    insertion_values.append(b"")
+            rows.append(insertion_values)
 
         try:
-            self.validate_insert(insertion_values)
+            if len(rows) == 1:
+                self.validate_insert(rows[0])
+            else:
+                for insertion_values in rows:
+                    self.validate_insert(insertion_values, skip_uni=True)
+                self.validate_unique(rows)
         except Exception as e:
             # traceback.print_exc()
             print('Constraint Violation has occurred: ', e)
             return
-        
-        insertion_record = record(
-            self.id_row,
-            np.uint8(len(all_columns)),
-            self.column_data["data_types"],
-            insertion_values
-        )
 
-        if not self.validate_record(insertion_record):
-            raise OverflowError(f"Record {insertion_values} exceeds maximum"
-                                            f" possible record byte size {self.max_rec_size}")
+        insertion_records = []
+        for row_id, insertion_values in enumerate(rows, self.id_row):
+            insertion_record = record(
+                row_id,
+                np.uint8(len(all_columns)),
+                self.column_data["data_types"],
+                self.intern_text(list(map(native, insertion_values)))
+            )
+
+            if not self.fit_record(insertion_record):
+                raise OverflowError(f"Record {insertion_values} exceeds maximum"
+                                                f" possible record byte size {self.max_rec_size}")
+            insertion_records.append(insertion_record)
 
-        ptr_to_record = data_pointer[record](record.get_id, insertion_record)
-        self.bptree.insert(ptr_to_record)
-        self.id_row += 1
+        for insertion_record in insertion_records:
+            self.bptree.append(insertion_record)
+        self.id_row += len(insertion_records)
+        self.dirty = True
+        self.drop_mirror()
 
         return self.id_row
 
     def update(self, update_op: Dict, condition: Dict) -> None:
 
-        keys_to_update = []
-        record_refs_all = []
-
         if condition and "column_order" not in condition:
             condition["column_order"] = self.get_order_column_name(condition["column_name"])
         
@@ -274,50 +790,32 @@ class Table:
             print(traceback.format_exception_only(e.__class__, e)[-1])
             return
 
-        if condition and condition["column_name"] in self.indexes:
-            index : Index  = self.indexes[condition["column_name"]]
-            current_leaf = index.first_record()
+        filter_ = record.apply_filter(condition)
+        update_ = record.record_updater(update_op)
 
-            record_refs = []
-            
-            if current_leaf is not None:
-                for key in current_leaf.keys:
-                    for i in self.data_pointers:
-                        dp : data_pointer = i
-                        if key.id == dp.id:
-                            record_refs.append(dp.data)
-                
-                updated_refs = record.filter_update(record_refs, update_op, condition)
-
-                for rec in updated_refs:
-                    if not self.validate_record(rec):
-                        raise OverflowError(f"Record {rec.data_values} exceeds maximum"
-                                            f" possible record byte size {self.max_rec_size}")
+        if (row_ids := self.matching_ids(condition)) is not None:
+            for row_id in row_ids:
+                leaf, idx = self.bptree.search(self.bptree.root, row_id)
+                if idx is None or not filter_(rec := leaf.keys[idx]):
+                    continue
 
-                keys_to_update.extend(current_leaf.keys)
-                record_refs_all.extend(updated_refs)
+                self.apply_update(rec, update_)
+                self.bptree.mark_dirty(leaf)
+                self.dirty = True
+                self.drop_mirror()
 
         else:
-            current_leaf = self.first_record()
-
-            while current_leaf:
-                record_refs = [key.data for key in current_leaf.keys]
-
-                updated_refs = record.filter_update(record_refs, update_op, condition)
+            for current_leaf in self.matching_leaves(condition):
+                updated_refs = [
+                    self.apply_update(key, update_)
+                    for key in current_leaf.keys if filter_(key)
+                ]
 
-                for rec in updated_refs:
-                    if not self.validate_record(rec):
-                       raise OverflowError(f"Record {rec.data_values} exceeds maximum"
-                                            f" possible record byte size {self.max_rec_size}")
+                if updated_refs:
+                    self.bptree.mark_dirty(current_leaf)
+                    self.dirty = True
+                    self.drop_mirror()
 
-                keys_to_update.extend(current_leaf.keys)
-                record_refs_all.extend(updated_refs)
-
-                current_leaf = current_leaf.next
-
-        for key, rec in zip(keys_to_update, record_refs_all):
-                key.data = rec
-        
         return
 
     def delete(self, condition: Dict = None):
@@ -328,7 +826,10 @@ class Table:
             condition["column_order"] = self.get_order_column_name(condition["column_name"])
         
         if condition is None:
-            self.bptree = b_plus_tree()
+            buffer_pool.get().forget(self)
+            self.bptree = b_plus_tree(self.min_degree, self.leaf_degree)
+            self.rewrite_all = True
+            self.dirty = True
             return
         
         try:
@@ -337,21 +838,16 @@ class Table:
             print(traceback.format_exception_only(e.__class__, e)[-1])
             return
 
-        if condition and condition["column_name"] in self.indexes:
-            index : Index  = self.indexes[condition["column_name"]]
-
-            current_leaf = index.first_record()
+        if (row_ids := self.matching_ids(condition)) is not None:
+            table_keys = self.lookup_all(row_ids)
 
             record_refs = []
             record_id_set = set()
 
-            if current_leaf is not None:
-                for key in current_leaf.keys:
-                    for i in self.data_pointers:
-                        dp : data_pointer = i
-                        if key.id == dp.id:
-                            record_refs.append(dp.data) 
-                            record_id_set.add(key.id)
+            if table_keys:
+                for rec in table_keys:
+                    record_refs.append(rec)
+                    record_id_set.add(rec.id)
 
                 updated_refs = record.filter_delete(record_refs, condition)
 
@@ -361,15 +857,13 @@ class Table:
                 if id not in retained_id_set:
                     ids_to_delete.add(id) 
 
-            for id in ids_to_delete:
-                self.bptree.delete(id)
-                self.recently_deleted.add(id)
+            for rec in table_keys:
+                if rec.id in ids_to_delete:
+                    self.free_overflow(rec.spilled())
 
         else:
-            current_leaf = self.first_record()
-
-            while current_leaf:
-                record_refs = [key.data for key in current_leaf.keys]
+            for current_leaf in self.matching_leaves(condition):
+                record_refs = list(current_leaf.keys)
                 record_id_set = set(key.id for key in current_leaf.keys)
 
                 updated_refs = record.filter_delete(record_refs, condition)
@@ -380,14 +874,55 @@ class Table:
                     if id not in retained_id_set:
                         ids_to_delete.add(id) 
 
-                current_leaf = current_leaf.next
+                for rec in record_refs:
+                    if rec.get_id() not in retained_id_set:
+                        self.free_overflow(rec.spilled())
 
-            for id in ids_to_delete:
-                self.bptree.delete(id)
-                self.recently_deleted.add(id)
+        # Every matching row leaves its leaf in one pass, the tree is
+        # rebalanced once afterwards.
+        if ids_to_delete:
+            self.bptree.delete_many(ids_to_delete)
+            self.recently_deleted.update(ids_to_delete)
+            self.dirty = True
+            self.drop_mirror()
 
         return
 
+    def vacuum(self, renumber: bool = False) -> int:
+        """
+        Rebuild the table into full leaves and lay its file out again from
+        scratch, dropping the pages freed by deletes and the ids kept in
+        recently_deleted. With renumber the rows get the ids 0 to n - 1 and
+        id_row goes back to n, indexes on the table have to be rebuilt. The
+        new tree is built beside the old one, which serves reads until it is
+        swapped in.
+
+        Returns the number of bytes of pages reclaimed.
+        """
+        tree = self.bptree
+        pages_before = self.page_count
+
+        rows = list(tree.cursor())
+        if renumber:
+            rows = [record(row_id, rec.num_columns, rec.data_types, rec.data_values)
+                    for row_id, rec in enumerate(rows)]
+            self.id_row = len(rows)
+
+        # Rows only ever go to the right of the last leaf, so the leaves are
+        # filled to the brim.
+        packed = b_plus_tree.bulk_load(rows, 1.0, self.min_degree, self.leaf_degree)
+
+        buffer_pool.get().forget(self)
+        self.bptree = packed
+        self.recently_deleted = set()
+        self.rewrite_all = True
+        self.dirty = True
+
+        if self.pager is None:
+            return 0
+        self.flush()
+        return (pages_before - self.page_count) * self.page_size
+
     def select(self, selection_dict: Dict) -> List[List]:
 
         col_ord_list = self.get_order_column_name_list(selection_dict["column_name_list"])
@@ -404,34 +939,23 @@ class Table:
         if condition and condition["column_name"] in self.indexes:
             index : Index  = self.indexes[condition["column_name"]]
 
-            current_leaf = index.first_record()
+            table_keys = self.lookup_all(index.matching_ids(condition))
 
-            if current_leaf is not None:
-                record_refs = []
-
-                for key in current_leaf.keys:
-                    for i in self.data_pointers:
-                        dp : data_pointer = i
-                        if key.id == dp.id:
-                            record_refs.append(dp.data) 
+            if table_keys:
+                record_refs = table_keys
 
                 sels = record.filter_subset(record_refs, col_ord_list, condition)
                 for sel in sels:
                     selections.add(tuple(sel))
                 
+        elif (mirror := self.mirror(condition)) is not None:
+            selections.update(mirror.select(col_ord_list, condition))
 
         else:
-            current_leaf = self.first_record()
+            for sel in self.scan_select(col_ord_list, condition):
+                selections.add(tuple(sel))
 
-            while current_leaf:
-                record_refs = [key.data for key in current_leaf.keys if key.id not in self.recently_deleted]
-                
-                sels = record.filter_subset(record_refs, col_ord_list, condition)
-                
-                for sel in sels:
-                    selections.add(tuple(sel))
-                
-                current_leaf = current_leaf.next
+            self.scanned_clean = True
 
         selections = [list(sel) for sel in selections]
         return selections, selection_dict["column_name_list"] or self.column_data["column_names"]
@@ -456,7 +980,7 @@ class Table:
         else:
             raise NameError(f"Column {col_name} not found in {self.name}")
 
-    def validate_insert(self, value_list: List[Any]) -> bool:
+    def validate_insert(self, value_list: List[Any], skip_uni: bool = False) -> bool:
 
         names = self.column_data["column_names"]
         types = self.column_data["data_types"]
@@ -464,11 +988,35 @@ class Table:
         col_role = self.column_data["column_key_types"]
 
         for i, (typ, is_null, role, val) in enumerate(zip(types, nullables, col_role, value_list)):
-            nv = self.validate_property(i, typ, is_null, role, val, names)
+            nv = self.validate_property(i, typ, is_null, role, val, names, skip_uni)
             value_list[i] = nv
             
         return True
 
+    def validate_unique(self, rows: List[List[Any]]) -> bool:
+        """
+        Check the values of validated rows in the unique and primary key
+        columns against each other and, with one scan per column, against
+        the rows of the table. NULLs never clash.
+        """
+        names = self.column_data["column_names"]
+
+        for i, role in enumerate(self.column_data["column_key_types"]):
+            if role != "UNI" and role != "PRI":
+                continue
+            values = [row[i] for row in rows if row[i] is not None]
+            if not values:
+                continue
+
+            found, _ = self.select({"condition": {}, "column_name_list": [names[i]]})
+            taken = {native(sel[0]) for sel in found}
+            for val in values:
+                if native(val) in taken:
+                    raise ValueError(f"{names[i]} has a constraint of uniqueness, and {val} currently exists")
+                taken.add(native(val))
+
+        return True
+
     def validate_property(self, i, typ, is_null, role, val, names, skip_uni=False):
         if val is None or val == b"" or val == "":
             if is_null == "YES":
@@ -539,8 +1087,8 @@ class Table:
                     pred = True
 
             elif typ_string == "TEXT":
-                pred = (isinstance(val, str)
-                        and len(val) <= 115)
+                # Values too long for a cell spill to overflow pages.
+                pred = isinstance(val, str)
                 new_val = val
 
         except ValueError:
@@ -605,15 +1153,145 @@ class Table:
         
         return True
 
+    def mark_clean(self) -> None:
+        self.dirty = False
+        self.saved_id_row = self.id_row
+
     def validate_record(self, rec: record) -> bool:
         return len(rec.object_to_bytes()) <= self.max_rec_size
 
-    def first_record(self) -> b_plus_node:
-        for uid in range(self.id_row):
-            if uid not in self.recently_deleted:
-                node, idx = self.bptree.search(self.bptree.root, uid)
-                if node and idx is not None:
-                    return node
+    def lookup(self, row_id: int) -> record:
+        node, idx = self.bptree.search(self.bptree.root, row_id)
+        if node and idx is not None:
+            return node.keys[idx]
 
         return None
 
+    def lookup_all(self, row_ids) -> List[record]:
+        found = []
+        for row_id in row_ids:
+            if (dp := self.lookup(row_id)) is not None:
+                found.append(dp)
+
+        return found
+
+    def matching_ids(self, condition: Dict) -> List[int]:
+        """
+        Ids of the rows that may match condition, from an index on its
+        column or from the columnar mirror. None when neither can answer and
+        the leaves have to be scanned.
+        """
+        if not condition:
+            return None
+
+        if condition["column_name"] in self.indexes:
+            return self.indexes[condition["column_name"]].matching_ids(condition)
+
+        if (mirror := self.mirror(condition)) is not None:
+            return mirror.matching_ids(condition)
+
+        return None
+
+    def mirror(self, condition: Dict = None) -> column_store:
+        """
+        Columnar mirror able to evaluate condition, None when the leaves are
+        to be scanned instead. The mirror is built on the second scan of a
+        large table that has not changed since the first, so tables taking
+        writes between reads (and inserts checking uniqueness) never pay for
+        building one.
+        """
+        if not ConfigManager.get_columnar_scan():
+            return None
+
+        if self.column_mirror is None:
+            if (not self.mirrorable or not self.scanned_clean
+                    or self.id_row < ConfigManager.get_columnar_min_rows()):
+                return None
+            records = [rec for leaf in self.scan_leaves() for rec in leaf.keys]
+            self.column_mirror = column_store.from_records(records, self.column_data["data_types"])
+            if self.column_mirror is None:
+                # Rows that can't be lined up in columns, don't try again
+                # until they change.
+                self.mirrorable = False
+                return None
+
+        return self.column_mirror if self.column_mirror.supports(condition) else None
+
+    def drop_mirror(self) -> None:
+        self.column_mirror = None
+        self.scanned_clean = False
+        self.mirrorable = True
+
+    def scan_leaves(self):
+        """
+        Walk the leaves from the leftmost one onwards, keeping each leaf
+        pinned in the buffer pool while the caller works on it.
+        """
+        current_leaf = self.first_record()
+
+        while current_leaf:
+            buffer_pool.pin(current_leaf)
+            try:
+                yield current_leaf
+            finally:
+                buffer_pool.unpin(current_leaf)
+            current_leaf = current_leaf.next
+
+    def pushdown(self, condition: Dict) -> bool:
+        # Whether leaves the buffer pool has evicted can be scanned on their
+        # pages for condition, see record.match_cells.
+        return not condition or condition["negated"] != "TRUE"
+
+    def cold_cells(self, leaf: b_plus_node, condition: Dict):
+        """
+        Page and offsets of the cells of an evicted leaf matching condition,
+        read without decoding the leaf, and the packed_columns of the page
+        if it has any, decoded in one go.
+        """
+        page_n = self.pager.read_page(leaf.page_num)
+        header = page_header.bytes_to_object(page_n)
+        offsets = page_header.cell_offsets(page_n, header.num_cells)
+        block = None
+        if header.flags & page_header.PACKED_COLUMNS:
+            block = packed_columns.bytes_to_object(page_n, offsets)
+        if condition:
+            offsets = record.match_cells(page_n, offsets, condition, self, block)
+
+        return page_n, offsets, block
+
+    def matching_leaves(self, condition: Dict):
+        """
+        Walk the leaves like scan_leaves, passing over the evicted ones in
+        which no record matches condition without reading them in.
+        """
+        pushdown = self.pushdown(condition)
+
+        for current_leaf in self.scan_leaves():
+            if current_leaf.is_resident() or not pushdown:
+                yield current_leaf
+            elif self.cold_cells(current_leaf, condition)[1]:
+                yield current_leaf
+
+    def scan_select(self, col_ord_list: List[int], condition: Dict):
+        """
+        Values of the columns in col_ord_list of every row matching
+        condition. Leaves the buffer pool has evicted stay evicted: their
+        cells are matched and projected on the page, decoding only the
+        condition's column and the selected ones.
+        """
+        pushdown = self.pushdown(condition)
+
+        for current_leaf in self.scan_leaves():
+            if current_leaf.is_resident() or not pushdown:
+                record_refs = [key for key in current_leaf.keys if key.id not in self.recently_deleted]
+                yield from record.filter_subset(record_refs, col_ord_list, condition)
+                continue
+
+            page_n, offsets, block = self.cold_cells(current_leaf, condition)
+            yield from record.project_cells(page_n, offsets, col_ord_list, self, block)
+
+    def first_record(self) -> b_plus_node:
+        # The leftmost leaf, kept by the tree so that no page is read and no
+        # node is walked to reach it.
+        return self.bptree.head
+
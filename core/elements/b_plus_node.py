@@ -9,9 +9,33 @@ class b_plus_node(b_tree_node):
         Args:
         - leaf: Indicates if the node is a leaf node or not.
         - parent: Parent node reference.
+
+        A leaf whose keys have been evicted by the buffer pool keeps its place
+        in the tree, and its keys are read back through its owner on access.
         """
+        self._keys = []
+        self.owner = None
+        self.referenced = False
+        self.pin_count = 0
         super().__init__(leaf)
         self.pointers: List[b_plus_node] = []
         self.parent: b_plus_node = parent
         self.next: b_plus_node = None
-        self.prev: b_plus_node = None
\ No newline at end of file
+        self.prev: b_plus_node = None
+
+    @property
+    def keys(self) -> List:
+        if self._keys is None:
+            self.owner.load_leaf(self)
+        self.referenced = True
+        return self._keys
+
+    @keys.setter
+    def keys(self, value: List) -> None:
+        self._keys = value
+
+    def is_resident(self) -> bool:
+        return self._keys is not None
+
+    def evict(self) -> None:
+        self._keys = None
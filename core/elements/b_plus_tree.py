@@ -1,14 +1,82 @@
 
 from __future__ import annotations
 import bisect
+from operator import attrgetter
 from typing import Tuple, Union
 from core.elements.b_plus_node import b_plus_node
-from core.elements.data_pointer import data_pointer
+from core.elements.record import record
 
 class b_plus_tree:
-    def __init__(self, min_ptr_degree: int = 3) -> None:
+    def __init__(self, min_ptr_degree: int = 3, min_leaf_degree: int = None) -> None:
         self.root = b_plus_node(True, None)
         self.min_degree = max(min_ptr_degree, 3)
+        # Leaves hold rows and interior nodes row ids, so a page fits a
+        # different number of each, see Table.size_nodes.
+        self.leaf_degree = max(min_leaf_degree or min_ptr_degree, 3)
+        # Leftmost leaf, where scans start, and rightmost leaf, where rows
+        # with new ids are appended.
+        self.head = self.root
+        self.tail = self.root
+        self.dirty_nodes = set()
+        self.freed_nodes = []
+
+    @classmethod
+    def bulk_load(cls, entries, fill_factor: float = 1.0, min_ptr_degree: int = 3,
+                  min_leaf_degree: int = None) -> b_plus_tree:
+        """
+        Build a tree bottom-up from entries already sorted by id, in one
+        linear pass: leaves are packed left to right and each interior level
+        is built over the one below it, with no searches or splits.
+
+        Args:
+        - entries: Rows sorted by id.
+        - fill_factor: Share of a node's capacity to fill, leaving room for
+          later inserts. Nodes never drop below the minimum fill.
+        - min_ptr_degree: Minimum degree of the interior nodes.
+        - min_leaf_degree: Minimum degree of the leaves, min_ptr_degree by
+          default.
+        """
+        tree = cls(min_ptr_degree, min_leaf_degree)
+        entries = list(entries)
+        t = tree.min_leaf_degree()
+        max_keys = tree.max_leaf_degree() - 1
+        target = max(t, min(max_keys, round(fill_factor * max_keys)))
+
+        if len(entries) <= max_keys:
+            tree.root.keys = entries
+            return tree
+
+        level = []
+        lows = []
+        for chunk in even_chunks(entries, target, t, max_keys):
+            leaf = b_plus_node(True, None)
+            leaf.keys = chunk
+            if level:
+                level[-1].next = leaf
+                leaf.prev = level[-1]
+            level.append(leaf)
+            lows.append(key_id(chunk[0]))
+        tree.head = level[0]
+        tree.tail = level[-1]
+
+        t = tree.min_ptr_degree()
+        max_keys = tree.max_ptr_degree() - 1
+        target = max(t, min(max_keys, round(fill_factor * max_keys)))
+        while len(level) > 1:
+            parents, parent_lows = [], []
+            chunks = even_chunks(list(zip(level, lows)), target + 1, t + 1, max_keys + 1)
+            for chunk in chunks:
+                node = b_plus_node(False, None)
+                node.pointers = [child for child, _ in chunk]
+                node.keys = [low for _, low in chunk[1:]]
+                for child in node.pointers:
+                    child.parent = node
+                parents.append(node)
+                parent_lows.append(chunk[0][1])
+            level, lows = parents, parent_lows
+
+        tree.root = level[0]
+        return tree
 
     def min_ptr_degree(self):
         return self.min_degree
@@ -16,25 +84,85 @@ class b_plus_tree:
     def max_ptr_degree(self):
         return 2 * self.min_degree
 
-    def search(self, node: b_plus_node, key: Union[data_pointer, int]) -> Tuple[b_plus_node, int]:
-        i = 0
-        n = len(node.keys)
+    def min_leaf_degree(self):
+        return self.leaf_degree
+
+    def max_leaf_degree(self):
+        return 2 * self.leaf_degree
+
+    def node_degree(self, node: b_plus_node) -> int:
+        return self.leaf_degree if node.is_leaf else self.min_degree
+
+    def mark_dirty(self, *nodes: b_plus_node) -> None:
+        for node in nodes:
+            if node is not None:
+                self.dirty_nodes.add(node)
+
+    def mark_freed(self, node: b_plus_node) -> None:
+        self.dirty_nodes.discard(node)
+        self.freed_nodes.append(node)
+
+    def search(self, node: b_plus_node, key: Union[record, int]) -> Tuple[b_plus_node, int]:
+        key = key_id(key)
+        node, i = self.seek(key, node)
+        keys = node.keys
+        if i < len(keys) and keys[i].row_id == key:
+            return (node, i)
+        return (node, None)
+
+    def seek(self, key: int, node: b_plus_node = None) -> Tuple[b_plus_node, int]:
+        """
+        Leaf where the rows with ids of key or more start, and the position
+        of the first of them in it. The position is past the last row when
+        every row of the leaf comes before key, the range then goes on in
+        the next leaf.
+
+        Router keys are plain ints and leaves are bisected on the row id of
+        their rows, so no comparison runs in Python.
+        """
+        node = node or self.root
+        while not node.is_leaf:
+            node = node.pointers[bisect.bisect_right(node.keys, key)]
+
+        return node, bisect.bisect_left(node.keys, key, key=row_id)
+
+    def cursor(self, low: int = None, high: int = None, reverse: bool = False):
+        """
+        Rows with ids from low up to, not including, high in id order, or
+        from the last of them backwards when reverse. A bound left out
+        leaves that end of the range open. The rows are read a leaf at a
+        time along the sibling links, once the first leaf is found.
+        """
+        if not reverse:
+            node, i = self.seek(low) if low is not None else (self.head, 0)
+            while node is not None:
+                keys = node.keys
+                stop = len(keys) if high is None else bisect.bisect_left(keys, high, i, key=row_id)
+                yield from keys[i:stop]
+                if stop < len(keys):
+                    return
+                node, i = node.next, 0
+            return
 
-        if node.is_leaf:
-            while i < n and key > node.keys[i]:
-                i += 1
-            if i < n and key == node.keys[i]:
-                return (node, i)
-            else:
-                return (node, None)
+        if high is not None:
+            node, i = self.seek(high)
         else:
-            while i < n and key >= node.keys[i]:
-                i += 1
-            return self.search(node.pointers[i], key)
-
-    def insert(self, entry: Union[data_pointer, int]) -> None:
+            node = self.root
+            while not node.is_leaf:
+                node = node.pointers[-1]
+            i = len(node.keys)
+        while node is not None:
+            keys = node.keys
+            start = 0 if low is None else bisect.bisect_left(keys, low, 0, i, key=row_id)
+            yield from reversed(keys[start:i])
+            if start > 0:
+                return
+            node = node.prev
+            i = len(node.keys) if node is not None else 0
+
+    def insert(self, entry: Union[record, int]) -> None:
         insertion_leaf, _ = self.search(self.root, entry)
-        max_key_fill = self.max_ptr_degree() - 1
+        max_key_fill = self.max_leaf_degree() - 1
 
         if len(insertion_leaf.keys) >= max_key_fill:
             (mkey, lc, rc) = self.split_insert_leaf(insertion_leaf, entry)
@@ -47,9 +175,73 @@ class b_plus_tree:
                 lc.parent = new_root
                 rc.parent = new_root
                 self.root = new_root
+                self.mark_dirty(new_root)
+
+        else:
+            bisect.insort_left(insertion_leaf.keys, entry, key=row_id)
+            self.mark_dirty(insertion_leaf)
+
+    def append(self, entry: record) -> None:
+        """
+        Insert a row whose id is above every id in the tree, like the next
+        id of a table, straight into the rightmost leaf without a search.
+        A full rightmost leaf is not split in half: it keeps its rows and a
+        new leaf starts with entry, splitting only the interior nodes on the
+        right spine that are full too. Appended rows thus fill their pages.
+        Rows that don't sort last go through insert.
+        """
+        leaf = self.tail
+        keys = leaf.keys
+        if keys:
+            in_order = keys[-1].row_id < entry.row_id
+        else:
+            # An empty leaf other than the root doesn't tell where its ids
+            # start.
+            in_order = leaf is self.root
+        if not in_order:
+            self.insert(entry)
+            return
+
+        if len(keys) < self.max_leaf_degree() - 1:
+            keys.append(entry)
+            self.mark_dirty(leaf)
+            return
+
+        new_leaf = b_plus_node(True, leaf.parent)
+        new_leaf.keys = [entry]
+        leaf.next = new_leaf
+        new_leaf.prev = leaf
+        self.tail = new_leaf
+        self.mark_dirty(leaf, new_leaf)
+        self.append_router(leaf, entry.row_id, new_leaf)
+
+    def append_router(self, left: b_plus_node, router: int, node: b_plus_node) -> None:
+        # Adds node, holding ids from router up, as the last child of the
+        # parent of left, the node that was rightmost on its level.
+        parent = left.parent
+        if parent is None:
+            new_root = b_plus_node(False, None)
+            new_root.keys = [router]
+            new_root.pointers = [left, node]
+            left.parent = new_root
+            node.parent = new_root
+            self.root = new_root
+            self.mark_dirty(new_root)
+
+        elif len(parent.keys) < self.max_ptr_degree() - 1:
+            parent.keys.append(router)
+            parent.pointers.append(node)
+            node.parent = parent
+            self.mark_dirty(parent)
 
         else:
-            bisect.insort_left(insertion_leaf.keys, entry)
+            # The router moves up, the new interior node starts with node as
+            # its only child.
+            sibling = b_plus_node(False, parent.parent)
+            sibling.pointers = [node]
+            node.parent = sibling
+            self.mark_dirty(sibling)
+            self.append_router(parent, router, sibling)
 
     def up_insert(self, parent: b_plus_node, router: int, lc: b_plus_node):
         max_key_fill = self.max_ptr_degree() - 1
@@ -65,10 +257,12 @@ class b_plus_tree:
                 lci.parent = new_root
                 rci.parent = new_root
                 self.root = new_root
+                self.mark_dirty(new_root)
         else:
             i = bisect.bisect_left(parent.keys, router)
             parent.pointers.insert(i, lc)
             parent.keys.insert(i, router)
+            self.mark_dirty(parent)
 
     def split_insert_internal(self, internal_node: b_plus_node, router: int, lc: b_plus_node):
         index = bisect.bisect_left(internal_node.keys, router)
@@ -87,27 +281,31 @@ class b_plus_tree:
 
         internal_node.keys = internal_node.keys[t+1:]
         internal_node.pointers = internal_node.pointers[t+1:]
+        self.mark_dirty(internal_node, split_node)
 
         return (median_key, split_node, internal_node)
 
 
-    def split_insert_leaf(self, leaf_node: b_plus_node, entry: Union[data_pointer, int]) -> Tuple[int, b_plus_node, b_plus_node]:
-        bisect.insort_left(leaf_node.keys, entry)
+    def split_insert_leaf(self, leaf_node: b_plus_node, entry: Union[record, int]) -> Tuple[int, b_plus_node, b_plus_node]:
+        bisect.insort_left(leaf_node.keys, entry, key=row_id)
 
         split_node = b_plus_node(True, leaf_node.parent)
-        t = self.min_ptr_degree()
+        t = self.min_leaf_degree()
 
         median_key = leaf_node.keys[t]
-        median_key = median_key.id if isinstance(median_key, data_pointer) else median_key
+        median_key = key_id(median_key)
         split_node.keys = leaf_node.keys[:t]
         leaf_node.keys = leaf_node.keys[t:]
 
         if leaf_node.prev:
             leaf_node.prev.next = split_node
+        else:
+            self.head = split_node
 
         split_node.prev = leaf_node.prev
         split_node.next = leaf_node
         leaf_node.prev = split_node
+        self.mark_dirty(leaf_node, split_node)
 
         return (median_key, split_node, leaf_node)
         
@@ -117,38 +315,46 @@ class b_plus_tree:
         if idx is None:
             return
 
-        val_loc.keys.remove(key)
+        val_loc.keys.pop(idx)
+        self.mark_dirty(val_loc)
 
         if self.is_underflow(val_loc) and val_loc.parent:
             vparent = val_loc.parent
             ptr_idx = vparent.pointers.index(val_loc)
             left_sib = vparent.pointers[ptr_idx - 1] if ptr_idx - 1 >= 0 else None
             right_sib = vparent.pointers[ptr_idx + 1] if ptr_idx + 1 < len(vparent.pointers) else None
-            transfer_max = self.min_ptr_degree() + 1
+            transfer_max = self.min_leaf_degree() + 1
 
             if right_sib and len(right_sib.keys) <= transfer_max:
-                val_loc.keys += right_sib.keys
+                self.merge(val_loc, right_sib)
                 vparent.pointers.pop(ptr_idx + 1)
                 vparent.keys.pop(ptr_idx)
+                self.mark_freed(right_sib)
 
             elif left_sib and len(left_sib.keys) <= transfer_max:
-                left_sib.keys += val_loc.keys
+                self.merge(left_sib, val_loc)
                 vparent.pointers.pop(ptr_idx)
                 vparent.keys.pop(ptr_idx - 1)
+                self.mark_dirty(left_sib)
+                self.mark_freed(val_loc)
 
             elif right_sib and len(right_sib.keys) > transfer_max:
 
                 while self.is_underflow(val_loc) and not self.is_underflow(right_sib):
                     pull_key = right_sib.keys.pop(0)
                     val_loc.keys.append(pull_key)
-                    vparent.keys[ptr_idx] = right_sib.keys[0].id if isinstance(right_sib.keys[0], data_pointer) else right_sib.keys[0]
+                    vparent.keys[ptr_idx] = key_id(right_sib.keys[0])
+                self.mark_dirty(right_sib)
 
             elif left_sib and len(left_sib.keys) > transfer_max:
 
                 while self.is_underflow(val_loc) and not self.is_underflow(left_sib):
                     pull_key = left_sib.keys.pop()
                     val_loc.keys.insert(0, pull_key)
-                    vparent.keys[ptr_idx - 1] = pull_key.id if isinstance(pull_key, data_pointer) else pull_key
+                    vparent.keys[ptr_idx - 1] = key_id(pull_key)
+                self.mark_dirty(left_sib)
+
+            self.mark_dirty(vparent)
 
             if self.is_underflow(vparent):
                 self.fuse(vparent)
@@ -158,6 +364,120 @@ class b_plus_tree:
             return True
 
 
+    def delete_many(self, ids) -> int:
+        """
+        Delete the rows with the given ids in one pass over the leaves that
+        hold them, each found by a single seek, then rebalance the tree once.
+        Ids not in the tree are passed over.
+
+        Returns the number of rows deleted.
+        """
+        ids = sorted(ids)
+        touched = []
+        deleted = 0
+        i = 0
+        leaf = None
+        while i < len(ids):
+            # Dense ids go on in the next leaf, which is only looked at
+            # when it is in memory already.
+            following = leaf.next if leaf is not None else None
+            if (following is not None and following.is_resident() and following.keys
+                    and ids[i] <= following.keys[-1].row_id):
+                leaf = following
+            else:
+                leaf, _ = self.seek(ids[i])
+            keys = leaf.keys
+            # Every id up to the last row of the leaf is either in it or
+            # not in the tree.
+            j = bisect.bisect_right(ids, keys[-1].row_id, i) if keys else i
+            gone = set(ids[i:j])
+            kept = [key for key in keys if key.row_id not in gone]
+            if len(kept) < len(keys):
+                deleted += len(keys) - len(kept)
+                leaf.keys = kept
+                self.mark_dirty(leaf)
+                touched.append(leaf)
+            i = max(j, i + 1)
+
+        self.rebalance(touched)
+        return deleted
+
+    def delete_range(self, low: int = None, high: int = None) -> int:
+        """
+        Delete the rows with ids from low up to, not including, high, walking
+        the leaves of the range along their sibling links, then rebalance the
+        tree once. A bound left out leaves that end of the range open.
+
+        Returns the number of rows deleted.
+        """
+        node, i = self.seek(low) if low is not None else (self.head, 0)
+        touched = []
+        deleted = 0
+        while node is not None:
+            keys = node.keys
+            stop = len(keys) if high is None else bisect.bisect_left(keys, high, i, key=row_id)
+            if stop > i:
+                deleted += stop - i
+                node.keys = keys[:i] + keys[stop:]
+                self.mark_dirty(node)
+                touched.append(node)
+            if stop < len(keys):
+                break
+            node, i = node.next, 0
+
+        self.rebalance(touched)
+        return deleted
+
+    def rebalance(self, leaves) -> None:
+        """
+        Bring the leaves rows were deleted from back to the minimum fill,
+        left to right, then the interior nodes above them. An underfull
+        leaf is merged with a sibling when their rows fit one node and the
+        rows of both are shared out evenly otherwise, so leaves emptied by a
+        bulk delete are fixed in one step instead of one row at a time.
+        """
+        t = self.min_leaf_degree()
+        parents = []
+        merged = set()
+
+        for leaf in leaves:
+            parent = leaf.parent
+            if parent is None or leaf in merged or not self.is_underflow(leaf):
+                continue
+
+            while self.is_underflow(leaf) and len(parent.pointers) > 1:
+                ptr_idx = parent.pointers.index(leaf)
+                if ptr_idx + 1 < len(parent.pointers):
+                    left, right, router = leaf, parent.pointers[ptr_idx + 1], ptr_idx
+                else:
+                    left, right, router = parent.pointers[ptr_idx - 1], leaf, ptr_idx - 1
+
+                rows = left.keys + right.keys
+                if len(rows) <= 2 * t:
+                    self.merge(left, right)
+                    parent.pointers.pop(router + 1)
+                    parent.keys.pop(router)
+                    self.mark_dirty(left)
+                    self.mark_freed(right)
+                    merged.add(right)
+                    leaf = left
+                else:
+                    half = len(rows) // 2
+                    left.keys, right.keys = rows[:half], rows[half:]
+                    parent.keys[router] = key_id(right.keys[0])
+                    self.mark_dirty(left, right)
+
+            self.mark_dirty(parent)
+            parents.append(parent)
+
+        for node in dict.fromkeys(parents):
+            if not self.is_underflow(node):
+                continue
+            # Fusing an earlier node may have merged this one away.
+            if node is self.root or (node.parent is not None
+                                     and any(ptr is node for ptr in node.parent.pointers)):
+                self.fuse(node)
+
     def fuse(self, node: b_plus_node):
 
         if gp := node.parent:
@@ -172,7 +492,10 @@ class b_plus_tree:
                 node.keys = node.keys + [median_key] + rs.keys
                 for ptr in rs.pointers:
                     ptr.parent = node
+                    self.mark_dirty(ptr)
                 node.pointers.extend(rs.pointers)
+                self.mark_dirty(node)
+                self.mark_freed(rs)
 
             elif ls and len(ls.keys) <= transfer_max:
                 median_key = gp.keys.pop(idx-1)
@@ -180,7 +503,10 @@ class b_plus_tree:
                 ls.keys = ls.keys + [median_key] + node.keys
                 for ptr in node.pointers:
                     ptr.parent = ls
+                    self.mark_dirty(ptr)
                 ls.pointers.extend(node.pointers)
+                self.mark_dirty(ls)
+                self.mark_freed(node)
 
             elif rs and len(rs.keys) > transfer_max:
 
@@ -191,6 +517,8 @@ class b_plus_tree:
                     pull_ptr.parent = node
                     node.pointers.append(pull_ptr)
                     gp.keys[idx] = pull_key
+                    self.mark_dirty(pull_ptr)
+                self.mark_dirty(node, rs)
 
             elif ls and len(ls.keys) > transfer_max:
 
@@ -201,6 +529,10 @@ class b_plus_tree:
                     pull_ptr.parent = node
                     node.pointers.insert(0, pull_ptr)
                     gp.keys[idx-1] = pull_key
+                    self.mark_dirty(pull_ptr)
+                self.mark_dirty(node, ls)
+
+            self.mark_dirty(gp)
 
             if self.is_underflow(gp):
                 self.fuse(gp)
@@ -209,6 +541,8 @@ class b_plus_tree:
             new_root = node.pointers.pop()
             new_root.parent = None
             self.root = new_root
+            self.mark_dirty(new_root)
+            self.mark_freed(node)
 
     @staticmethod
     def borrow_left(node: b_plus_node, left_sib: b_plus_node):
@@ -229,18 +563,47 @@ class b_plus_tree:
         
         return False
 
-    @staticmethod
-    def merge(left: b_plus_node, right: b_plus_node):
+    def merge(self, left: b_plus_node, right: b_plus_node):
         
         left.next = right.next
         if right.next:
             right.next.prev = left
+        elif self.tail is right:
+            self.tail = left
         
         left.keys += right.keys
         return 
 
     def is_underflow(self, node: b_plus_node):
-        return len(node.keys) < self.min_ptr_degree()
+        return len(node.keys) < self.node_degree(node)
 
     def is_over_half(self, node: b_plus_node):
-        return len(node.keys) > self.min_ptr_degree()
+        return len(node.keys) > self.node_degree(node)
+
+
+row_id = attrgetter("row_id")
+
+
+def key_id(entry: Union[record, int]) -> int:
+    # Leaf entries are rows, router keys are plain row ids.
+    return entry.id if isinstance(entry, record) else entry
+
+
+def even_chunks(items: list, target: int, minimum: int, maximum: int) -> list:
+    """
+    Split items into consecutive chunks of about target items each, sized
+    as evenly as possible and kept within [minimum, maximum] wherever the
+    item count allows it.
+    """
+    n = len(items)
+    fewest = -(-n // maximum)
+    most = max(fewest, n // minimum)
+    count = min(most, max(fewest, round(n / target)))
+
+    base, extra = divmod(n, count)
+    chunks, start = [], 0
+    for i in range(count):
+        size = base + (1 if i < extra else 0)
+        chunks.append(items[start:start + size])
+        start += size
+    return chunks
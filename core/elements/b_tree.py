@@ -2,6 +2,7 @@ from __future__ import annotations
 from typing import Tuple, Union
 from core.elements.b_tree_node import b_tree_node
 from core.elements.data_pointer import data_pointer
+from core.elements.b_plus_tree import even_chunks
 
 
 class b_tree:
@@ -10,6 +11,44 @@ class b_tree:
         self.root = b_tree_node(True)
         self.min_degree = max(min_deg, 3)
 
+    @classmethod
+    def bulk_load(cls, entries, fill_factor: float = 1.0, min_deg: int = 3) -> b_tree:
+        """
+        Build a tree bottom-up from entries already sorted by id, in one
+        linear pass. Each level is cut into nodes of about fill_factor of
+        their capacity, and the key between two neighbouring nodes moves up
+        into the level above as their separator.
+        """
+        tree = cls(min_deg)
+        t = tree.min_ptr_degree()
+        max_keys = tree.max_ptr_degree() - 1
+        target = max(t - 1, min(max_keys, round(fill_factor * max_keys)))
+
+        level_keys = list(entries)
+        children = None
+
+        while len(level_keys) > max_keys:
+            # Every node but the last is followed by the separator it sends up,
+            # so chunk key + separator pairs and strip the trailing separator.
+            slots = even_chunks(level_keys + [None], target + 1, t, max_keys + 1)
+            next_keys, nodes = [], []
+            child_pos = 0
+            for slot in slots:
+                node = b_tree_node(children is None)
+                node.keys = slot[:-1]
+                if children is not None:
+                    node.pointers = children[child_pos:child_pos + len(slot)]
+                    child_pos += len(slot)
+                nodes.append(node)
+                if slot[-1] is not None:
+                    next_keys.append(slot[-1])
+            level_keys, children = next_keys, nodes
+
+        tree.root = b_tree_node(children is None)
+        tree.root.keys = level_keys
+        tree.root.pointers = children or []
+        return tree
+
     def min_ptr_degree(self):
         return self.min_degree
 
@@ -151,6 +190,17 @@ class b_tree:
                         return self._delete(left_sibling, key)
 
 
+    def traverse(self, node: b_tree_node):
+        if node.is_leaf:
+            yield from node.keys
+            return
+
+        for i, key in enumerate(node.keys):
+            yield from self.traverse(node.pointers[i])
+            yield key
+
+        yield from self.traverse(node.pointers[-1])
+
     @staticmethod
     def merge(left: b_tree_node, median_key: Union[data_pointer, int], right: b_tree_node):
         left.keys = left.keys + [median_key] + right.keys
@@ -11,7 +11,9 @@ class b_tree_node:
         - keys: List to hold keys (values) stored in this node.
         - pointers: List to hold pointers to child nodes or data in leaf nodes.
         - is_leaf: Flag indicating whether the node is a leaf or internal node.
+        - page_num: Page the node is stored in, None until it is first written.
         """
         self.keys: List[Union[data_pointer, int]] = []
         self.pointers: List[b_tree_node] = []
         self.is_leaf = leaf
+        self.page_num: int = None
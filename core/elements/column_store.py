@@ -0,0 +1,144 @@
+from __future__ import annotations
+import datetime as dt
+import numpy as np
+from typing import Any, Dict, List
+from core.elements.data_type import data_type
+from core.elements.overflow_text import overflow_text
+from core.elements.record import record
+
+
+class column_store:
+    """
+    Columnar mirror of a table's rows, one NumPy array per column, so that a
+    WHERE clause on a numeric or date column is evaluated as a single
+    vectorized mask instead of once per record. The mirror is a snapshot:
+    the table drops it whenever a row changes and builds it again from its
+    leaves on a later scan.
+
+    Attributes:
+    - row_ids (np.ndarray): Row id of every row, in tree order.
+    - columns (List[np.ndarray]): Typed array per column usable in a
+      vectorized comparison, None for the other columns.
+    - nulls (List[np.ndarray]): Null bitmap per column, True where the row
+      has no value.
+    - values (List[np.ndarray]): Object array per column with the values as
+      the records hold them, selected rows are projected from these.
+    """
+
+    INT_TYPES = {"TINYINT", "SMALLINT", "INT", "BIGINT", "LONG", "YEAR"}
+    FLOAT_TYPES = {"FLOAT", "DOUBLE"}
+    # Stand-ins for NULLs in the typed arrays, the null bitmaps hide them.
+    FILL = {
+        data_type.DATE: dt.date(1970, 1, 1),
+        data_type.DATETIME: dt.datetime(1970, 1, 1),
+    }
+
+    def __init__(self, row_ids: np.ndarray, columns: List[np.ndarray],
+                 nulls: List[np.ndarray], values: List[np.ndarray]) -> None:
+        self.row_ids = row_ids
+        self.columns = columns
+        self.nulls = nulls
+        self.values = values
+
+    @classmethod
+    def from_records(cls, records: List[record], d_types: List[data_type]) -> column_store:
+        """
+        Build the mirror of records, None when some record does not hold one
+        value per column (NULLs read back from older files are left out of
+        their records) and the columns can't be lined up.
+        """
+        grid = np.empty((len(records), len(d_types)), dtype=object)
+        try:
+            if records:
+                grid[:] = [rec.data_values for rec in records]
+        except ValueError:
+            return None
+
+        row_ids = np.fromiter((rec.row_id for rec in records), dtype=np.int64, count=len(records))
+
+        columns, nulls, values = [], [], []
+        for col_ord, d_type in enumerate(d_types):
+            vals = np.ascontiguousarray(grid[:, col_ord])
+            null = np.equal(vals, None)
+            values.append(vals)
+            nulls.append(null)
+            columns.append(cls.typed_column(d_type, vals.tolist(), null))
+
+        return cls(row_ids, columns, nulls, values)
+
+    @classmethod
+    def typed_column(cls, d_type: data_type, col_values, null: np.ndarray) -> np.ndarray:
+        name, _, _, type_class = d_type.value
+        count = len(col_values)
+
+        if null.any():
+            fill = cls.FILL.get(d_type, 0)
+            col_values = [fill if is_null else v for v, is_null in zip(col_values, null)]
+
+        if name in cls.INT_TYPES:
+            # Integers come back from the pages unsigned. Values past the
+            # int64 range don't get a signed array, records compare those.
+            column = np.array(col_values)
+            return column if column.dtype.kind == "i" else None
+        elif name in cls.FLOAT_TYPES:
+            # FLOAT stays float32, comparisons agree with the records.
+            return np.fromiter(col_values, dtype=type_class, count=count)
+        elif d_type is data_type.DATE:
+            days = np.fromiter(map(dt.date.toordinal, col_values), dtype=np.int64, count=count)
+            return (days - _EPOCH_ORDINAL).astype("datetime64[D]")
+        elif d_type is data_type.DATETIME:
+            micros = np.fromiter(map(_epoch_micros, col_values), dtype=np.int64, count=count)
+            return micros.astype("datetime64[us]")
+
+        return None
+
+    def supports(self, condition: Dict) -> bool:
+        if not condition:
+            return True
+        return (
+            condition.get("negated") != "TRUE"
+            and condition["value"] is not None
+            and self.columns[condition["column_order"]] is not None
+        )
+
+    def mask(self, condition: Dict) -> np.ndarray:
+        if not condition:
+            return np.ones(len(self.row_ids), dtype=bool)
+
+        c_ord = condition["column_order"]
+        column = self.columns[c_ord]
+        rval = self.typed_value(column, condition["value"])
+        hits = record.COND_OPER[condition["comparator"]](column, rval)
+
+        return hits & ~self.nulls[c_ord]
+
+    @staticmethod
+    def typed_value(column: np.ndarray, value: Any) -> Any:
+        if isinstance(value, (dt.date, dt.datetime)):
+            return np.datetime64(value).astype(column.dtype)
+        return value
+
+    def matching_ids(self, condition: Dict) -> List[int]:
+        return self.row_ids[self.mask(condition)].tolist()
+
+    def select(self, col_ord_list: List[int], condition: Dict) -> List[tuple]:
+        """
+        Rows matching condition, projected to col_ord_list (every column
+        when empty) by fancy indexing the value arrays.
+        """
+        hits = np.flatnonzero(self.mask(condition))
+        col_ords = col_ord_list or range(len(self.values))
+        projected = [self.values[c][hits].tolist() for c in col_ords]
+
+        return [
+            tuple(v.value if isinstance(v, overflow_text) else v for v in row)
+            for row in zip(*projected)
+        ]
+
+
+_EPOCH_ORDINAL = dt.date(1970, 1, 1).toordinal()
+
+
+def _epoch_micros(value: dt.datetime) -> int:
+    seconds = value.hour * 3600 + value.minute * 60 + value.second
+    return ((value.toordinal() - _EPOCH_ORDINAL) * 86400 + seconds) * 10**6 + value.microsecond
@@ -1,10 +1,13 @@
 from dataclasses import dataclass
-import io
 from typing import Any
 import numpy as np
+from struct import Struct
 
 @dataclass
 class data_cell:
+    # left child page number, row id
+    CELL_FORMAT = Struct(">II")
+
     def __init__(self, row_id, lc_page_no) -> None:
         # Initialize data cell attributes
         self.row_id_val: np.uint32 = row_id
@@ -16,17 +19,14 @@ class data_cell:
         cp_byte_stream = self.int_object_to_bytes(self.lc_page_number, 4)
         return b"".join((cp_byte_stream, row_id_byte_stream))
 
-    @classmethod
-    def bytes_to_object(cls, byte_stream: bytes):
-        # Convert byte streams back to DataCell object
-        raw = io.BytesIO(byte_stream)
-        read_buff = io.BufferedRandom(raw)
-
-        cp_byte_stream = read_buff.read(4)
-        lc_page_num = cls.bytes_to_int(cp_byte_stream)
+    def pack_into(self, buffer, offset: int) -> None:
+        # Writes the cell into buffer at offset, as object_to_bytes encodes it
+        self.CELL_FORMAT.pack_into(buffer, offset, self.lc_page_number, self.row_id_val)
 
-        row_id_b = read_buff.read(4)
-        row_id = cls.bytes_to_int(row_id_b)
+    @classmethod
+    def bytes_to_object(cls, byte_stream: bytes, offset: int = 0):
+        # Convert byte streams back to DataCell object, in place
+        lc_page_num, row_id = cls.CELL_FORMAT.unpack_from(byte_stream, offset)
         return cls(row_id, lc_page_num)
 
     @classmethod
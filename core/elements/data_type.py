@@ -2,6 +2,7 @@
 import numpy as np
 import datetime as dt
 from enum import Enum
+from functools import lru_cache
 from typing import Any
 from struct import pack, unpack
 
@@ -45,9 +46,11 @@ class data_type(Enum):
 
     @classmethod
     def from_id_byte(cls, bytes_to_int: bytes):
-        typing_map = cls.type_id_to_type_mapping()
-        x = int.from_bytes(bytes_to_int, "big")
-        return typing_map.get(x, cls.TEXT)
+        return cls.from_id(int.from_bytes(bytes_to_int, "big"))
+
+    @classmethod
+    def from_id(cls, type_id: int):
+        return _type_id_map(cls).get(type_id, cls.TEXT)
 
     def bytes_to_typed_value(self, byte_data: bytes):
         if (type_ := self.value[0]) == "NULL":
@@ -85,7 +88,7 @@ class data_type(Enum):
             return dt.date.fromtimestamp(s_epoch)
 
         elif type_ == "TEXT":
-            return byte_data.decode()
+            return str(byte_data, "utf-8")
 
 
     def typed_value_to_bytes(self, value: Any):
@@ -130,5 +133,7 @@ class data_type(Enum):
         return int.to_bytes(0, self.value[2], "big")
 
 
-
-
+@lru_cache(maxsize=None)
+def _type_id_map(cls):
+    # Built once, from_id is called for every column of every decoded cell
+    return cls.type_id_to_type_mapping()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+from struct import Struct
+from typing import Any
+
+
+class overflow_text:
+    """
+    TEXT value too long to stay in its record's cell.
+
+    The cell keeps only the value's length and the first page of a chain of
+    overflow pages in the owning table's file, the text itself is read from
+    the chain each time it is asked for. Statements that never touch the
+    column never read its pages. A value not flushed yet keeps its text in
+    memory until the table allocates its chain.
+
+    Attributes:
+    - text (str): The value, until it is written to a chain.
+    - length (int): Size in bytes of the UTF-8 encoded value.
+    - first_page (int): First page of the chain, None until written.
+    - owner (Table): Table whose file holds the chain.
+    """
+
+    # Type id byte of a spilled value in a cell, unused by data_type.
+    TYPE_ID = 7
+    # length, first page
+    REF_FORMAT = Struct(">II")
+
+    def __init__(self, text: str = None, length: int = 0, first_page: int = None,
+                 owner: Any = None) -> None:
+        self.text = text
+        self.length = len(text.encode()) if text is not None else length
+        self.first_page = first_page
+        self.owner = owner
+
+    @property
+    def value(self) -> str:
+        if self.text is not None:
+            return self.text
+        return self.owner.read_overflow(self.first_page, self.length)
+
+    def is_written(self) -> bool:
+        return self.first_page is not None
+
+    def bind(self, owner: Any, first_page: int = None) -> None:
+        self.owner = owner
+        if first_page is not None:
+            self.first_page = first_page
+            self.text = None
+
+    def object_to_bytes(self) -> bytes:
+        # Records are sized before their chains exist, page 0 stands in.
+        first_page = 0 if self.first_page is None else self.first_page
+        return self.REF_FORMAT.pack(self.length, first_page)
+
+    @classmethod
+    def bytes_to_object(cls, byte_stream: bytes, offset: int = 0) -> overflow_text:
+        length, first_page = cls.REF_FORMAT.unpack_from(byte_stream, offset)
+        return cls(length=length, first_page=first_page)
+
+    def __repr__(self) -> str:
+        return f"<overflow {self.length} bytes at page {self.first_page}>"
@@ -0,0 +1,251 @@
+from __future__ import annotations
+import datetime as dt
+from functools import lru_cache
+from operator import itemgetter
+from struct import Struct
+from typing import Any, Callable, List
+import numpy as np
+from core.config.config_manager import ConfigManager
+from core.elements.data_type import data_type
+
+
+class packed_columns:
+    """
+    Integer, DATE and DATETIME columns of a leaf page stored once for the
+    whole page instead of in every cell: a base value, a scale and one
+    delta per row, bit-packed at the narrowest width that holds them all.
+    The deltas are taken from the smallest value of the page (frame of
+    reference) or, for a column that never decreases along the page, from
+    the previous row, whichever packs tighter. DATE and DATETIME are packed
+    as the milliseconds typed_value_to_bytes stores them.
+
+    The block follows the cell offset array of a page whose header has
+    page_header.PACKED_COLUMNS set, and the cells of that page leave its
+    columns out, type id byte included. Pages are only packed when every
+    row holds a value for every column, so the remaining columns of a cell
+    keep their order.
+
+    Block layout: column count (1), then per column its position in the
+    row (1), its type id (1), the bit width of its deltas (1, top bit set
+    for deltas from the previous row), base (8) and scale (8), followed by
+    the packed deltas of every column, ceil(rows * width / 8) bytes each.
+
+    Attributes:
+    - ordinals (tuple): Positions of the packed columns in the row, ascending.
+    - d_types (tuple): Type of each packed column.
+    - raw (List[np.ndarray]): Values of each packed column as stored, uint64.
+    - rows (dict): Cell offset -> row of that cell in the columns, for
+      blocks read from a page.
+    """
+
+    INT_TYPES = {"TINYINT", "SMALLINT", "INT", "BIGINT", "LONG", "YEAR"}
+    PACKABLE = INT_TYPES | {"DATE", "DATETIME"}
+    FROM_PREVIOUS = 0x80
+
+    COUNT_FORMAT = Struct(">B")
+    # position, type id, width, base, scale
+    COLUMN_FORMAT = Struct(">BBBQQ")
+
+    def __init__(self, ordinals: tuple, d_types: tuple, raw: List[np.ndarray],
+                 plans: List[tuple] = None) -> None:
+        self.ordinals = ordinals
+        self.d_types = d_types
+        self.raw = raw
+        # Mode, bit width, base and scale of each column, see _plan.
+        self.plans = plans
+        self.rows = {}
+        self._values = {}
+
+    @classmethod
+    def from_records(cls, records: List[Any]) -> packed_columns:
+        """
+        Pack the columns of the records of one leaf that come out smaller
+        packed than in their cells, None when none does or the page has
+        fewer rows than ConfigManager.get_packed_min_rows().
+        """
+        if len(records) < ConfigManager.get_packed_min_rows():
+            return None
+        d_types = records[0].data_types
+        width = len(d_types)
+        for rec in records:
+            if len(rec.data_values) != width or any(v is None for v in rec.data_values):
+                return None
+
+        ordinals, types, raw, plans = [], [], [], []
+        for col_ord, d_type in enumerate(d_types):
+            name, type_id, size, _ = d_type.value
+            if name not in cls.PACKABLE or any(
+                    rec.data_types[col_ord].value[1] != type_id for rec in records):
+                continue
+
+            if name in cls.INT_TYPES:
+                stored = (rec.data_values[col_ord] for rec in records)
+            else:
+                stored = (int.from_bytes(d_type.typed_value_to_bytes(rec.data_values[col_ord]), "big")
+                          for rec in records)
+            column = np.fromiter(stored, dtype=np.uint64, count=len(records))
+            plan = _plan(column)
+            packed_size = cls.COLUMN_FORMAT.size + (len(records) * plan[1] + 7) // 8
+            if packed_size < len(records) * (size + 1):
+                ordinals.append(col_ord)
+                types.append(d_type)
+                raw.append(column)
+                plans.append(plan)
+
+        if not ordinals:
+            return None
+        return cls(tuple(ordinals), tuple(types), raw, plans)
+
+    def object_to_bytes(self) -> bytes:
+        heads, bodies = [self.COUNT_FORMAT.pack(len(self.ordinals))], []
+        for col_ord, d_type, column, plan in zip(self.ordinals, self.d_types, self.raw, self.plans):
+            mode, bits, base, scale = plan
+            start = np.uint64(base)
+            deltas = column - start if mode == 0 else np.diff(column, prepend=start)
+            heads.append(self.COLUMN_FORMAT.pack(col_ord, d_type.value[1], mode | bits, base, scale))
+            bodies.append(_pack_bits(deltas // np.uint64(scale), bits))
+
+        return b"".join(heads + bodies)
+
+    @classmethod
+    def bytes_to_object(cls, byte_stream: bytes, offsets) -> packed_columns:
+        """
+        Read the block of a packed leaf page whose cells are at offsets,
+        decoding every column at once.
+        """
+        num_rows = len(offsets)
+        pos = 16 + 2 * num_rows
+        count = byte_stream[pos]
+        heads = _heads_format(count).unpack_from(byte_stream, pos + 1)
+        pos += 1 + count * cls.COLUMN_FORMAT.size
+        # Every column starts on a byte, all of them are unpacked to bits
+        # at once and each is summed from its own slice.
+        lengths = [(num_rows * (width & ~cls.FROM_PREVIOUS) + 7) // 8 for width in heads[2::5]]
+        bits = np.unpackbits(np.frombuffer(byte_stream[pos:pos + sum(lengths)], dtype=np.uint8))
+
+        ordinals, types, raw = [], [], []
+        start = 0
+        for i, length in enumerate(lengths):
+            col_ord, type_id, width, base, scale = heads[5 * i:5 * i + 5]
+            n_bits = width & ~cls.FROM_PREVIOUS
+            column = bits[start:start + num_rows * n_bits].reshape(num_rows, n_bits) @ _weights(n_bits)
+            start += 8 * length
+            if scale != 1:
+                column *= np.uint64(scale)
+            if width & cls.FROM_PREVIOUS:
+                column = column.cumsum(dtype=np.uint64)
+            column += np.uint64(base)
+            ordinals.append(col_ord)
+            types.append(data_type.from_id(type_id))
+            raw.append(column)
+
+        block = cls(tuple(ordinals), tuple(types), raw)
+        block.rows = {ci: row for row, ci in enumerate(offsets)}
+        return block
+
+    def values(self, i: int) -> List:
+        """
+        Column i of the block as the values a cell decodes to: Python ints,
+        or dates and datetimes converted the way bytes_to_typed_value does.
+        """
+        if i not in self._values:
+            column = self.raw[i]
+            name = self.d_types[i].value[0]
+            if name in self.INT_TYPES:
+                self._values[i] = column.tolist()
+            elif name == "DATE":
+                self._values[i] = list(map(dt.date.fromtimestamp, (column / 1000).tolist()))
+            else:
+                self._values[i] = list(map(dt.datetime.fromtimestamp, (column / 1000).tolist()))
+        return self._values[i]
+
+    def match(self, offsets, col_order: int, comp: Callable, rval: Any) -> List[int]:
+        """
+        The offsets, every cell of the page in order, whose packed value
+        col_order compares true with rval. Integers are compared as one
+        vectorized mask when rval fits the stored values.
+        """
+        i = self.ordinals.index(col_order)
+        if (self.d_types[i].value[0] in self.INT_TYPES and type(rval) is int
+                and 0 <= rval <= 0xFFFFFFFFFFFFFFFF):
+            hits = comp(self.raw[i], np.uint64(rval)).tolist()
+        else:
+            hits = [comp(lval, rval) for lval in self.values(i)]
+        return [ci for ci, hit in zip(offsets, hits) if hit]
+
+    def cell_position(self, col_order: int) -> int:
+        # Where column col_order lies in the cells, which leave the packed
+        # columns out.
+        return col_order - sum(1 for c in self.ordinals if c < col_order)
+
+    def fill(self, records: List[Any], rows: List[int] = None) -> None:
+        """
+        Put the packed values back in records decoded from the cells of the
+        page, row rows[k] (k by default) going to records[k].
+        """
+        if not records:
+            return
+        width = len(records[0].data_values) + len(self.ordinals)
+        merge = self.merge_order(tuple(range(width)))
+        packed_rows = list(zip(*[self.values(i) for i in range(len(self.ordinals))]))
+        if rows is not None:
+            packed_rows = [packed_rows[row] for row in rows]
+        merged = {}
+        for rec, packed_row in zip(records, packed_rows):
+            rec.data_values = list(merge((*rec.data_values, *packed_row)))
+            # Records of one signature share their type list, they keep
+            # sharing the merged one.
+            d_types = merged.get(id(rec.data_types))
+            if d_types is None:
+                d_types = merged[id(rec.data_types)] = list(merge((*rec.data_types, *self.d_types)))
+            rec.data_types = d_types
+            rec.num_columns = width
+            # The cell read from the page lacks the packed columns.
+            rec.encoded = None
+
+    def merge_order(self, col_ords: tuple) -> itemgetter:
+        """
+        Getter putting the columns col_ords back in order from the values
+        of a cell, those of col_ords left in it, followed by the packed
+        ones in col_ords.
+        """
+        in_cell = [c for c in col_ords if c not in self.ordinals]
+        cell_pos, packed_pos = iter(range(len(in_cell))), iter(range(len(in_cell), len(col_ords)))
+        order = [next(packed_pos) if c in self.ordinals else next(cell_pos) for c in col_ords]
+        if len(order) == 1:
+            return lambda values: values[order[0]:order[0] + 1]
+        return itemgetter(*order)
+
+def _plan(column: np.ndarray):
+    """
+    Mode, bit width, base and scale column packs into, the mode taking
+    deltas from the previous row when that needs fewer bits.
+    """
+    base = column.min()
+    best = (0, base, column - base)
+    if len(column) > 1 and bool(np.all(column[1:] >= column[:-1])):
+        steps = np.diff(column, prepend=column[0])
+        if steps.max() < best[2].max():
+            best = (packed_columns.FROM_PREVIOUS, column[0], steps)
+
+    mode, base, deltas = best
+    scale = int(np.gcd.reduce(deltas)) or 1
+    return mode, int(deltas.max() // np.uint64(scale)).bit_length(), int(base), scale
+
+
+def _pack_bits(deltas: np.ndarray, bits: int) -> bytes:
+    if bits == 0:
+        return b""
+    shifts = np.arange(bits - 1, -1, -1, dtype=np.uint64)
+    return np.packbits(((deltas[:, None] >> shifts) & np.uint64(1)).astype(np.uint8)).tobytes()
+
+
+@lru_cache(maxsize=None)
+def _heads_format(count: int) -> Struct:
+    return Struct(">" + "BBBQQ" * count)
+
+
+@lru_cache(maxsize=None)
+def _weights(n_bits: int) -> np.ndarray:
+    # Value of each bit of an n_bits wide delta, most significant first.
+    return np.uint64(1) << np.arange(n_bits - 1, -1, -1, dtype=np.uint64)
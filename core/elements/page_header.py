@@ -1,6 +1,7 @@
 from dataclasses import dataclass
-import io
+from functools import lru_cache
 from itertools import starmap
+from struct import Struct
 from typing import Any
 import numpy as np
 from core.elements.page_type import page_type
@@ -17,12 +18,20 @@ class page_header:
     - data_start: Start position of data in the page.
     - right_relative: Right relative pointer.
     - parent: Pointer to the parent page.
+    - flags: Layout flags of the page, see PACKED_COLUMNS.
     """
     pagetype: page_type
     num_cells: np.uint16
     data_start: np.uint16
     right_relatve: np.uint32
     parent: np.uint32
+    flags: int = 0
+
+    # type, flags, cell count, data start, right pointer, parent, unused
+    HEADER_FORMAT = Struct(">BBHHII2x")
+    # A leaf page whose cells leave out the columns of a packed_columns
+    # block following the cell offsets.
+    PACKED_COLUMNS = 0x01
 
     @classmethod
     def bytes_to_int(cls,byte_st: bytes):
@@ -49,7 +58,7 @@ class page_header:
                 self.int_object_to_bytes,
                 [
                     (self.pagetype, 1),
-                    (0, 1),
+                    (self.flags, 1),
                     (self.num_cells, 2),
                     (self.data_start, 2),
                     (self.right_relatve, 4),
@@ -59,6 +68,20 @@ class page_header:
             )
         )
 
+    def pack_into(self, buffer) -> None:
+        # Writes the header at the start of buffer, as object_to_bytes
+        # encodes it
+        self.HEADER_FORMAT.pack_into(
+            buffer, 0, self.pagetype, self.flags, self.num_cells,
+            self.data_start, self.right_relatve, self.parent
+        )
+
+    @classmethod
+    def clear(cls, view: memoryview, start: int, end: int) -> None:
+        # Zeroes view[start:end], the gap between the offsets and the cells
+        # of a page encoded into a reused buffer
+        view[start:end] = _zeros(len(view))[start:end]
+
     @classmethod
     def default_header(cls, is_root=False):
         # Generates a default header
@@ -72,27 +95,32 @@ class page_header:
 
     @classmethod
     def bytes_to_object(cls, byte_stream: bytes):
-        # Converts bytes to a page_header object
-        
-        base_obj = cls.default_header()
-        raw = io.BytesIO(byte_stream)
-        read_buff = io.BufferedRandom(raw)
-        
-        pagetype = cls.bytes_to_int(read_buff.read(1))
-        base_obj.pagetype = page_type.from_int(pagetype)
+        # Converts bytes to a page_header object, reading the fields in place
+        # so a memoryview over a mapped page is never copied
+        pagetype, flags, n_cells, pg_data_start, right_relative, parent = (
+            cls.HEADER_FORMAT.unpack_from(byte_stream)
+        )
 
-        read_buff.read(1)
-        n_cells = cls.bytes_to_int(read_buff.read(2))
-        base_obj.num_cells = np.uint16(n_cells)
+        return cls(
+            page_type.from_int(pagetype),
+            np.uint16(n_cells),
+            np.uint16(pg_data_start),
+            np.uint32(right_relative),
+            np.uint32(parent),
+            flags
+        )
 
-        pg_data_start = cls.bytes_to_int(read_buff.read(2))
-        base_obj.data_start = np.uint16(pg_data_start)
+    @classmethod
+    def cell_offsets(cls, byte_stream: bytes, num_cells: int):
+        # Reads the cell offset array that follows the header, in place
+        return _offset_array(int(num_cells)).unpack_from(byte_stream, 16)
 
-        right_relative = cls.bytes_to_int(read_buff.read(4))
-        base_obj.right_relatve = np.uint32(right_relative)
 
-        parent = cls.bytes_to_int(read_buff.read(4))
-        base_obj.parent = np.uint32(parent)
+@lru_cache(maxsize=None)
+def _offset_array(num_cells: int) -> Struct:
+    return Struct(f">{num_cells}H")
 
-        return base_obj
 
+@lru_cache(maxsize=None)
+def _zeros(page_size: int) -> memoryview:
+    return memoryview(bytes(page_size))
@@ -9,12 +9,18 @@ class page_type(IntEnum):
         • A value of 5 (0x05) means the page is an table b-tree interior page.
         • A value of 10 (0x0a) means the page is an index b-tree leaf page.
         • A value of 13 (0x0d) means the page is a table b-tree leaf page.
+        • A value of 7 (0x07) means the page is a dictionary page, part of
+          the chain holding a table's dictionary of coded TEXT values.
+        • A value of 15 (0x0f) means the page is an overflow page, part of a
+          chain holding a value spilled out of a leaf cell.
         Any other value for the b-tree page type is an error.
     """
     index_interior_page = 2
     table_interior_page = 5
+    dictionary_page = 7
     index_leaf_page = 10
     table_leaf_page = 13
+    overflow_page = 15
 
     @classmethod
     def from_int(cls, int_val: int):
@@ -34,9 +40,13 @@ class page_type(IntEnum):
             return cls.index_interior_page
         elif int_val == 5:
             return cls.table_interior_page
+        elif int_val == 7:
+            return cls.dictionary_page
         elif int_val == 10:
             return cls.index_leaf_page
         elif int_val == 13:
             return cls.table_leaf_page
+        elif int_val == 15:
+            return cls.overflow_page
         else:
             raise ValueError
\ No newline at end of file
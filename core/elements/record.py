@@ -1,17 +1,26 @@
 from __future__ import annotations
-import io
 import numpy as np
-from dataclasses import dataclass
-from functools import total_ordering
+from dataclasses import dataclass, field
+from functools import lru_cache, total_ordering
 from itertools import filterfalse
+from struct import Struct
 from typing import Any, Dict, List, Union
-from operator import lt, gt, eq, ne, ge, le, itemgetter
+from operator import call, lt, gt, eq, ne, ge, le, itemgetter
 from core.elements.data_type import data_type
+from core.elements.overflow_text import overflow_text
+from core.elements.text_dictionary import coded_text
 
 
-@dataclass
+@dataclass(slots=True)
 @total_ordering
 class record:
+    """
+    One row, kept as is in the leaves of a table's b_plus_tree and of an
+    index's b_tree. The row id doubles as the key, so no wrapper is needed
+    around it. Values are plain Python objects, except FLOAT which stays a
+    float32 so that it prints at single precision, and TEXT which may be the
+    coded_text shared by every row of the table holding that value.
+    """
 
     COND_OPER = {
     "=": eq,
@@ -45,10 +54,20 @@ class record:
 
     COND_NOT_LIST = set({v: k for k, v in COND_OPER_NOT.items()}.keys()) | set(COND_OPER_NOT.keys())
 
+    # payload size, row id, column count
+    CELL_HEAD_FORMAT = Struct(">HIB")
+
     row_id: np.uint32
     num_columns: np.uint8
     data_types: List[data_type]
     data_values: List
+    # The cell as last encoded or read from its page, None once the record
+    # changes. Size checks, leaf pages and the log all reuse it.
+    encoded: bytes = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def id(self) -> int:
+        return self.row_id
 
     def get_id(self):
         return self.row_id
@@ -57,6 +76,14 @@ class record:
         acc_list = []
         type_id_list = []
         for v, typ in zip(self.data_values, self.data_types):
+            if isinstance(v, coded_text):
+                acc_list.append(v.object_to_bytes())
+                type_id_list.append(int.to_bytes(coded_text.TYPE_ID, 1, "big"))
+                continue
+            if isinstance(v, overflow_text):
+                acc_list.append(v.object_to_bytes())
+                type_id_list.append(int.to_bytes(overflow_text.TYPE_ID, 1, "big"))
+                continue
             acc_list.append(typ.typed_value_to_bytes(v))
             type_id_list.append(typ.get_id_bytes(v))
 
@@ -66,18 +93,50 @@ class record:
         return self.int_object_to_bytes(self.num_columns, 1) + data_type_bytes + dval_bytes
 
     def object_to_bytes(self):
+        if self.encoded is not None:
+            return self.encoded
+
         payload = self.cell_byte_stream()
         payload_size = len(payload)
         row_id_byte_stream = self.int_object_to_bytes(self.row_id, 4)
-        return b''.join([
+        self.encoded = b''.join([
             self.int_object_to_bytes(payload_size, 2),
             row_id_byte_stream,
             payload
         ])
+        return self.encoded
+
+    def invalidate(self) -> None:
+        self.encoded = None
+
+    def cell_into(self, view: memoryview, end: int, col_ords: tuple = ()) -> int:
+        """
+        Copy the cell into view so that it ends at end and return where it
+        starts. The columns col_ords are left out, type ids included, as a
+        packed leaf page stores them. Cut out of the encoded cell.
+        """
+        cell = self.object_to_bytes()
+        if not col_ords:
+            start = end - len(cell)
+            view[start:end] = cell
+            return start
+
+        num_cols = cell[6]
+        type_ids, spans, size = _compile_strip(cell[7:7 + num_cols], col_ords)
+        start = end - size
+        self.CELL_HEAD_FORMAT.pack_into(view, start, size - 6, self.row_id, len(type_ids))
+        pos = start + 7
+        view[pos:pos + len(type_ids)] = type_ids
+        pos += len(type_ids)
+        values = memoryview(cell)[7 + num_cols:]
+        for lo, hi in spans:
+            view[pos:pos + hi - lo] = values[lo:hi]
+            pos += hi - lo
+        return start
 
     def matches_condition(self, condition: Dict) -> bool:
 
-        lval = self.data_values[condition["column_order"]]
+        lval = self.value(condition["column_order"])
         rval = condition["value"]
         comp = condition["comparator"]
         if condition["negated"] == "TRUE":
@@ -85,6 +144,14 @@ class record:
 
         return self.COND_OPER[comp](lval, rval)
 
+    def value(self, col_order: int):
+        # Spilled TEXT values are read from their overflow pages here.
+        val = self.data_values[col_order]
+        return val.value if isinstance(val, overflow_text) else val
+
+    def spilled(self) -> List[overflow_text]:
+        return [v for v in self.data_values if isinstance(v, overflow_text)]
+
     def update_val(self, operation: Dict):
 
         rval = operation["value"]
@@ -93,7 +160,8 @@ class record:
         col_name = operation["column_name"]
 
         if isinstance(rval, type_cast):
-            self.data_values[operation["column_order"]] = type_cast(rval)
+            self.data_values[operation["column_order"]] = native(type_cast(rval))
+            self.encoded = None
             return self
         else:
             raise TypeError(f"{rval} isn't a valid value for {col_name} of type {type_.value[0]}")
@@ -102,7 +170,7 @@ class record:
     def __lt__(self, other: Union[record, int]):
         
         if isinstance(other, int):
-            self.row_id < other
+            return self.row_id < other
         
         return self.row_id < other.row_id
         
@@ -118,46 +186,138 @@ class record:
         return (f"{self.data_values}")
 
     @classmethod
-    def bytes_to_object(cls, byte_stream: bytes):
-        raw = io.BytesIO(byte_stream)
-        read_buff = io.BufferedRandom(raw)
-        
-        d_types = []
-        d_vals = []
-
-        payload_size_b = read_buff.read(2)
-        row_id_b = read_buff.read(4)
-        row_id = cls.bytes_to_int(row_id_b)
-        
-        num_cols_b = read_buff.read(1)
-        num_cols = cls.bytes_to_int(num_cols_b)
+    def bytes_to_object(cls, byte_stream: bytes, offset: int = 0, words: List[str] = None):
+        # Cell layout: payload size (2), row id (4), column count (1), one
+        # type id byte per column, then the values. The type ids fix the
+        # position of every value, so all of them are unpacked in place from
+        # byte_stream with the one Struct compiled for that signature.
+        # Coded TEXT values are looked up in words, the table's dictionary.
+        payload_size, row_id, num_cols = cls.CELL_HEAD_FORMAT.unpack_from(byte_stream, offset)
+        pos = offset + 7
+        layout, converters, d_types, coded = _compile_layout(bytes(byte_stream[pos:pos + num_cols]))
+
+        d_vals = list(map(call, converters, layout.unpack_from(byte_stream, pos + num_cols)))
+        for i in coded:
+            d_vals[i] = words[d_vals[i]]
+
+        rec = cls(
+            row_id,
+            num_cols,
+            d_types,
+            d_vals
+        )
+        # Copied out of the page, which may be a view of a mapped file.
+        rec.encoded = bytes(byte_stream[offset:offset + 6 + payload_size])
+        return rec
 
-        for _ in range(num_cols):
-            type_id_byte = read_buff.read(1)
-            d_type = data_type.from_id_byte(type_id_byte)
-            d_types.append((d_type, cls.bytes_to_int(type_id_byte)))
+    @classmethod
+    def match_cells(cls, byte_stream: bytes, offsets, condition: Dict, owner: Any = None,
+                    block: Any = None) -> List[int]:
+        """
+        Offsets of the cells at offsets in byte_stream that match condition.
+        The condition's value is read where it lies in each cell and nothing
+        else is decoded. Coded TEXT values are compared by code for = and
+        <>. A cell whose value is NULL or spilled is decoded whole, its
+        overflow values read through owner. The condition must not be
+        negated. block is the packed_columns of a packed page, offsets are
+        then every cell of it.
+        """
+        comp = cls.COND_OPER[condition["comparator"]]
+        col_order = condition["column_order"]
+        rval = condition["value"]
+        if block is not None:
+            if col_order in block.ordinals:
+                return block.match(offsets, col_order, comp, rval)
+            col_order = block.cell_position(col_order)
+        words = owner.dictionary.words if owner is not None else None
+        by_code = condition["comparator"] in {"=", "<>"}
+        rcode = owner.dictionary.code_of(rval) if owner is not None else -1
+        matched = []
+
+        for ci in offsets:
+            num_cols = byte_stream[ci + 6]
+            pos = ci + 7
+            reader = _compile_column(bytes(byte_stream[pos:pos + num_cols]), col_order)
+
+            if reader is None:
+                rec = cls.bytes_to_object(byte_stream, ci, words)
+                if block is not None:
+                    block.fill([rec], [block.rows[ci]])
+                for ref in rec.spilled():
+                    ref.bind(owner)
+                if rec.matches_condition(condition):
+                    matched.append(ci)
+                continue
 
+            offset, layout, converter, coded = reader
+            lval = layout.unpack_from(byte_stream, pos + num_cols + offset)[0]
+            if coded:
+                if by_code:
+                    if comp(lval, rcode):
+                        matched.append(ci)
+                    continue
+                lval = words[lval]
+            elif converter is not None:
+                lval = converter(lval)
+            if comp(lval, rval):
+                matched.append(ci)
+
+        return matched
 
-        d_types_clean = []
-        for d_type, type_id_int in d_types:
-            if d_type is data_type.NULL:
+    @classmethod
+    def project_cells(cls, byte_stream: bytes, offsets, col_ord_list: List[int],
+                      owner: Any = None, block: Any = None) -> List[List]:
+        """
+        Values of the columns in col_ord_list (every column when empty) of
+        the cells at offsets in byte_stream, like filter_subset returns them.
+        Only those columns are decoded, the others are skipped over. Coded
+        and spilled values are read through owner. block is the
+        packed_columns of a packed page, its columns are taken from there.
+        """
+        col_ords = tuple(col_ord_list)
+        words = owner.dictionary.words if owner is not None else None
+        rows = []
+        merge = None
+
+        if block is not None and offsets:
+            col_ords = col_ords or tuple(range(byte_stream[offsets[0] + 6] + len(block.ordinals)))
+            packed = [block.values(block.ordinals.index(c)) for c in col_ords if c in block.ordinals]
+            packed_rows = list(zip(*packed))
+            if len(packed) == len(col_ords):
+                return [list(packed_rows[block.rows[ci]]) for ci in offsets]
+            if packed:
+                merge = block.merge_order(col_ords)
+            col_ords = tuple(block.cell_position(c) for c in col_ords if c not in block.ordinals)
+
+        for ci in offsets:
+            num_cols = byte_stream[ci + 6]
+            pos = ci + 7
+            projection = _compile_projection(bytes(byte_stream[pos:pos + num_cols]), col_ords)
+
+            if projection is None:
+                rec = cls.bytes_to_object(byte_stream, ci, words)
+                if block is not None:
+                    block.fill([rec], [block.rows[ci]])
+                for ref in rec.spilled():
+                    ref.bind(owner)
+                rows.extend(cls.filter_subset([rec], col_ord_list))
                 continue
-            elif d_type is data_type.TEXT:
-                read_len = type_id_int - d_type.value[1]
-            else:
-                read_len = d_type.value[2]
 
-            val_bytes = read_buff.read(read_len)
-            typed_val = d_type.bytes_to_typed_value(val_bytes)
-            d_vals.append(typed_val)
-            d_types_clean.append(d_type)
-
-        return cls(
-            row_id,
-            num_cols,
-            d_types_clean,
-            d_vals
-        )
+            layout, converters, pick, coded, spills = projection
+            values = list(map(call, converters, layout.unpack_from(byte_stream, pos + num_cols)))
+            row = [values[i] for i in pick]
+            for j in coded:
+                row[j] = words[row[j]]
+            if spills:
+                for ref in row:
+                    if isinstance(ref, overflow_text):
+                        ref.bind(owner)
+                row = [v.value if isinstance(v, overflow_text) else v for v in row]
+            if merge is not None:
+                row = list(merge((*row, *packed_rows[block.rows[ci]])))
+            rows.append(row)
+
+        return rows
 
     @classmethod
     def filter_update(cls, ls: List[record], operation: Dict, condition: Dict) -> List[record]:
@@ -171,11 +331,19 @@ class record:
         return list(filterfalse(filter_, ls))
 
     @classmethod
-    def filter_subset(cls, ls: List[record], col_ord_list: List[int], condition: Dict = None) -> List[List]:
+    def filter_subset(cls, ls: List[record], col_ord_list: List[int], condition: Dict = None,
+                      resolve: bool = True) -> List[List]:
+        # With resolve=False spilled values are returned as their overflow_text
+        # references, without reading their pages.
         filter_ = cls.apply_filter(condition) if condition else lambda x: True
         columns_filter = itemgetter(*col_ord_list) if col_ord_list else lambda x: tuple(x)
         cf_wrapper = lambda x: list(r) if isinstance((r := columns_filter(x)), tuple) else [r]
-        return [cf_wrapper(rec.data_values) for rec in filter(filter_, ls)]
+        if not resolve:
+            return [cf_wrapper(rec.data_values) for rec in filter(filter_, ls)]
+        return [
+            [v.value if isinstance(v, overflow_text) else v for v in cf_wrapper(rec.data_values)]
+            for rec in filter(filter_, ls)
+        ]
 
     @classmethod
     def apply_filter(cls, condition: Dict):
@@ -202,6 +370,160 @@ class record:
         return int.from_bytes(byte_st, "big")
 
 
+# Floats are stored in native byte order, see data_type.typed_value_to_bytes.
+_FLOAT_FORMAT = Struct("f")
+_DOUBLE_FORMAT = Struct("d")
+_UNSIGNED_CODES = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+
+def _field(type_id_int: int):
+    """
+    Struct code, converter and column type of a value with type id
+    type_id_int, None for NULL.
+    """
+    if type_id_int == overflow_text.TYPE_ID:
+        return f"{overflow_text.REF_FORMAT.size}s", overflow_text.bytes_to_object, data_type.TEXT
+    elif type_id_int == coded_text.TYPE_ID:
+        # The code, looked up in the table's dictionary by the caller.
+        return "H", int, data_type.TEXT
+
+    d_type = data_type.from_id(type_id_int)
+    name, _, size, type_class = d_type.value
+
+    if d_type is data_type.NULL:
+        return None
+    elif d_type is data_type.TEXT:
+        return f"{type_id_int - d_type.value[1]}s", bytes.decode, d_type
+    elif name in {"TINYINT", "SMALLINT", "INT", "BIGINT", "LONG", "YEAR"}:
+        # Integers are read unsigned, as int.from_bytes did.
+        return _UNSIGNED_CODES[size], int, d_type
+    elif name == "FLOAT":
+        return "4s", lambda raw: np.float32(_FLOAT_FORMAT.unpack(raw)[0]), d_type
+    elif name == "DOUBLE":
+        return "8s", lambda raw: _DOUBLE_FORMAT.unpack(raw)[0], d_type
+
+    return f"{size}s", d_type.bytes_to_typed_value, d_type
+
+
+@lru_cache(maxsize=4096)
+def _compile_layout(signature: bytes):
+    """
+    Struct, per value converters and column types for the values of cells
+    whose type id bytes are signature, and the positions of the coded TEXT
+    values among them. NULL columns hold no bytes and are left out of the
+    record, like before.
+    """
+    codes, converters, d_types, coded = [">"], [], [], []
+
+    for type_id_int in signature:
+        if (field := _field(type_id_int)) is None:
+            continue
+        code, converter, d_type = field
+        if type_id_int == coded_text.TYPE_ID:
+            coded.append(len(d_types))
+        codes.append(code)
+        converters.append(converter)
+        d_types.append(d_type)
+
+    return Struct("".join(codes)), tuple(converters), d_types, tuple(coded)
+
+
+@lru_cache(maxsize=4096)
+def _compile_column(signature: bytes, col_order: int):
+    """
+    Where value col_order of cells whose type id bytes are signature lies:
+    its offset from the first value, a Struct reading it, the converter to
+    apply after it, if any, and whether it is a dictionary code. Integers
+    and floats are compared as read. None when that value is spilled or
+    missing, and the cell has to be decoded. Columns are counted as in
+    record.data_values, without NULLs.
+    """
+    offset = 0
+    type_ids = [type_id_int for type_id_int in signature if _field(type_id_int) is not None]
+
+    for i, type_id_int in enumerate(type_ids):
+        code, converter, d_type = _field(type_id_int)
+        layout = Struct(f">{code}")
+        if i != col_order:
+            offset += layout.size
+            continue
+
+        if type_id_int == overflow_text.TYPE_ID:
+            return None
+        elif type_id_int == coded_text.TYPE_ID:
+            return offset, layout, None, True
+        elif converter is int:
+            return offset, layout, None, False
+        elif d_type is data_type.FLOAT:
+            # A float32 widened to a Python float compares like the float32.
+            return offset, Struct("=f"), None, False
+        elif d_type is data_type.DOUBLE:
+            return offset, Struct("=d"), None, False
+        return offset, layout, converter, False
+
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _compile_projection(signature: bytes, col_ords: tuple):
+    """
+    Struct reading only the values col_ords (every value when empty) of
+    cells whose type id bytes are signature, the others skipped as pad
+    bytes. Returned with their converters, the positions putting them back
+    in col_ords order, the positions of coded TEXT values in the result and
+    whether any of them may be spilled. None when a column of col_ords is
+    missing, as NULLs are left out of records.
+    """
+    type_ids = [type_id_int for type_id_int in signature if _field(type_id_int) is not None]
+    fields = list(map(_field, type_ids))
+    col_ords = col_ords or tuple(range(len(fields)))
+    if any(c >= len(fields) for c in col_ords):
+        return None
+
+    wanted = sorted(set(col_ords))
+    codes, converters = [">"], []
+    for i, (code, converter, _) in enumerate(fields):
+        if i in wanted:
+            codes.append(code)
+            converters.append(converter)
+        else:
+            codes.append(f"{Struct(f'>{code}').size}x")
+
+    pick = tuple(wanted.index(c) for c in col_ords)
+    coded = tuple(j for j, c in enumerate(col_ords) if type_ids[c] == coded_text.TYPE_ID)
+    spills = overflow_text.bytes_to_object in converters
+    return Struct("".join(codes)), tuple(converters), pick, coded, spills
+
+
+@lru_cache(maxsize=4096)
+def _compile_strip(signature: bytes, col_ords: tuple):
+    """
+    Type id bytes of cells whose type id bytes are signature once the
+    values col_ords are left out, the spans, from the first value, of the
+    values kept and the size of the cell left. Adjacent kept values share
+    a span.
+    """
+    type_ids, spans, offset = [], [], 0
+
+    for i, type_id_int in enumerate(signature):
+        field = _field(type_id_int)
+        size = Struct(f">{field[0]}").size if field is not None else 0
+        if i not in col_ords:
+            type_ids.append(type_id_int)
+            if spans and spans[-1][1] == offset:
+                spans[-1] = (spans[-1][0], offset + size)
+            else:
+                spans.append((offset, offset + size))
+        offset += size
 
+    size = 7 + len(type_ids) + sum(hi - lo for lo, hi in spans)
+    return bytes(type_ids), tuple(spans), size
+
+
+def native(value: Any) -> Any:
+    # NumPy scalars cost more than the Python objects they hold, rows keep
+    # the latter. float32 is kept, a Python float would print more digits.
+    if isinstance(value, np.generic) and not isinstance(value, np.float32):
+        return value.item()
+    return value
 
-        
@@ -0,0 +1,113 @@
+from __future__ import annotations
+from struct import Struct
+from typing import Any, Dict, List
+from core.config.config_manager import ConfigManager
+
+
+class coded_text(str):
+    """
+    TEXT value stored in cells as its code in the owning table's
+    text_dictionary. Every row holding the value shares the one instance.
+
+    Attributes:
+    - code (int): Position of the value in the dictionary.
+    """
+
+    # Type id byte of a coded value in a cell. TEXT ids are 12 plus the
+    # value's length, cells never get anywhere near this one.
+    TYPE_ID = 0xFF
+    CODE_FORMAT = Struct(">H")
+
+    def __new__(cls, value: str, code: int) -> coded_text:
+        word = super().__new__(cls, value)
+        word.code = code
+        return word
+
+    def object_to_bytes(self) -> bytes:
+        return self.CODE_FORMAT.pack(self.code)
+
+
+class text_dictionary:
+    """
+    Per-table dictionary of the short TEXT values its rows repeat. Cells
+    store a value's two byte code instead of its bytes, and decoded rows
+    share the one coded_text instance of each value.
+
+    Codes are handed out in order and never reused, so cells written
+    earlier stay valid as the dictionary grows. A column keeps adding values
+    until it has added the configured number of them, past that only the
+    values already coded are coded, so columns of mostly distinct values
+    don't fill the dictionary.
+
+    Attributes:
+    - words (List[coded_text]): The values, by code.
+    - codes (Dict[str, coded_text]): The coded instance of each value.
+    - columns (List[int]): Column each value was first added for.
+    - column_words (Dict[int, int]): Values added by each column.
+    - pages (List[int]): Pages holding the dictionary, in order.
+    - flushed (int): Number of values already written to those pages.
+    """
+
+    MAX_WORDS = 1 << 16
+    # Values are stored with a one byte length.
+    MAX_WORD_BYTES = 255
+
+    def __init__(self) -> None:
+        self.words: List[coded_text] = []
+        self.codes: Dict[str, coded_text] = {}
+        self.columns: List[int] = []
+        self.column_words: Dict[int, int] = {}
+        self.pages: List[int] = []
+        self.flushed = 0
+
+    @classmethod
+    def from_entries(cls, entries, pages: List[int]) -> text_dictionary:
+        """
+        Dictionary holding entries, (column, value) pairs in code order, read
+        back from pages.
+        """
+        dictionary = cls()
+        for col, value in entries:
+            dictionary.add(col, value)
+        dictionary.pages = pages
+        dictionary.flushed = len(dictionary.words)
+        return dictionary
+
+    def add(self, col: int, value: str) -> coded_text:
+        word = coded_text(value, len(self.words))
+        self.words.append(word)
+        self.codes[value] = word
+        self.columns.append(col)
+        self.column_words[col] = self.column_words.get(col, 0) + 1
+        return word
+
+    def intern(self, col: int, value: Any) -> Any:
+        """
+        The value to keep in column col of a row: the coded instance of a
+        TEXT value in the dictionary or admitted to it, the plain value
+        otherwise.
+        """
+        if not isinstance(value, str) or value == "":
+            return value
+
+        if (word := self.codes.get(value)) is not None:
+            return word
+
+        value = str(value)
+        if (len(self.words) >= self.MAX_WORDS
+                or self.column_words.get(col, 0) >= ConfigManager.get_dictionary_column_words()
+                or len(value.encode()) > self.MAX_WORD_BYTES):
+            return value
+
+        return self.add(col, value)
+
+    def code_of(self, value: Any) -> int:
+        # -1 for values without a code, which no cell holds.
+        word = self.codes.get(value) if isinstance(value, str) else None
+        return -1 if word is None else word.code
+
+    def entries(self) -> List[tuple]:
+        return list(zip(self.columns, self.words))
+
+    def is_flushed(self) -> bool:
+        return self.flushed == len(self.words)
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from core.config.config_manager import ConfigManager
+
+
+class buffer_pool:
+    """
+    Bounded set of decoded leaf pages shared by every open table.
+
+    Leaves are admitted when they are read from disk or first written, and
+    each one is charged its page size against the budget. When the budget
+    is exceeded the pool runs a clock (second chance) sweep: recently used
+    leaves get their reference bit cleared and are passed over once, while
+    pinned leaves and leaves with unflushed changes are never evicted. An
+    evicted leaf keeps its place in the tree and is read back from its page
+    the next time its keys are needed.
+
+    Attributes:
+    - capacity (int): Budget in bytes of page data kept decoded.
+    - used (int): Bytes currently charged to resident leaves.
+    - frames (OrderedDict): Resident leaves in clock order, mapped to their
+      (owner, cost).
+    """
+
+    _shared = None
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.used = 0
+        self.frames = OrderedDict()
+
+    @classmethod
+    def get(cls) -> "buffer_pool":
+        if cls._shared is None:
+            cls._shared = cls(ConfigManager.get_buffer_pool_size())
+        return cls._shared
+
+    def resize(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.evict()
+
+    def admit(self, node, owner) -> None:
+        node.referenced = True
+        if node not in self.frames:
+            # Make room first, so the leaf being admitted survives the sweep.
+            self.evict(owner.page_size)
+            self.frames[node] = (owner, owner.page_size)
+            self.used += owner.page_size
+
+    def forget(self, owner) -> None:
+        for node, (frame_owner, cost) in list(self.frames.items()):
+            if frame_owner is owner:
+                del self.frames[node]
+                self.used -= cost
+
+    @staticmethod
+    def pin(node) -> None:
+        node.pin_count += 1
+
+    @staticmethod
+    def unpin(node) -> None:
+        node.pin_count -= 1
+
+    def evict(self, reserve: int = 0) -> None:
+        sweeps = 2 * len(self.frames)
+
+        while self.used + reserve > self.capacity and self.frames and sweeps:
+            sweeps -= 1
+            node, (owner, cost) = next(iter(self.frames.items()))
+
+            if node.referenced or node.pin_count or not owner.can_evict(node):
+                node.referenced = False
+                self.frames.move_to_end(node)
+                continue
+
+            del self.frames[node]
+            self.used -= cost
+            node.evict()
@@ -11,12 +11,15 @@ from core.decoders.output_format import OutputFormat
 from core.decoders.sql_query_parser import SQLQueryParser
 from core.config.config_manager import ConfigManager
 from core.handlers.create_db import create_db
+from core.handlers.pager import pager
+from core.handlers.write_ahead_log import write_ahead_log
 
 
 class database_manager:
     @staticmethod
     def command_parse(command: str, tables: Dict, indexes: Dict):
         if command.lower() == "exit;":
+            write_ahead_log.get().close()
             ConfigManager.set_exit(True)
             return
         elif command.lower() == "clear;":
@@ -36,7 +39,7 @@ class database_manager:
                 parsed_tokens = SQLQueryParser(command).parse()[0]
                 SQLCommandHandler().router(parsed_tokens, tables, indexes)
                 database_manager.save_to_disk(tables, indexes)
-                database_manager.load_db(tables, indexes)
+                database_manager.release_cold(tables, indexes)
 
             except Exception as e:
                 print("Invalid command! Check syntax")
@@ -66,6 +69,9 @@ class database_manager:
     def drop_database(tables, indexes):
         exec_path = ConfigManager.get_exec_path()
         if os.path.exists(os.path.join(exec_path, ConfigManager.get_data_dir())):
+            for table in tables.values():
+                table.close()
+            write_ahead_log.get().discard()
             tables.clear()
             indexes.clear()
             for root, dirs, files in os.walk(
@@ -79,57 +85,112 @@ class database_manager:
         print(f"Initial database dropped!")
 
     @staticmethod
-    def save_to_disk(tables, indexes):
+    def save_to_disk(tables, indexes) -> bool:
+        """
+        Log the pages of every table and index changed by the last statement
+        and commit them as one unit to the write-ahead log.
+        """
         tbl_ext = ConfigManager.get_tbl_ext()
         ndx_ext = ConfigManager.get_ndx_ext()
         exec_path = ConfigManager.get_exec_path()
+        written = False
+        log = write_ahead_log.get()
 
         if not os.path.exists(os.path.join(exec_path, ConfigManager.get_data_dir())):
             os.makedirs(os.path.join(exec_path, ConfigManager.get_data_dir()))
 
-        for k, tab in tables.items():
-            if k not in {"system_tables", "system_columns"}:
-                rec_count = tab.id_row
-                parsed_tokens = SystemTable.update_table_data(k, rec_count)
+        # Recording a table's row count updates system_tables, so it is
+        # flushed last, after every table that could have dirtied it.
+        flush_order = [k for k in tables if k not in {"system_tables", "system_columns"}]
+        flush_order += [k for k in ("system_columns", "system_tables") if k in tables]
 
-                SQLCommandHandler().router(parsed_tokens, tables, indexes)
-                file_path = os.path.join(
-                    exec_path, ConfigManager.get_data_dir(), f"{k}{tbl_ext}"
-                )
-                with open(file_path, "wb") as f:
-                    f.write(tab.object_to_bytes())
+        for k in flush_order:
+            tab = tables[k]
+            if not tab.dirty:
+                continue
 
-        for k, tab in tables.items():
-            if k in {"system_tables", "system_columns"}:
-                rec_count = tab.id_row
-                parsed_tokens = SystemTable.update_table_data(k, rec_count)
+            if tab.id_row != tab.saved_id_row:
+                parsed_tokens = SystemTable.update_table_data(k, tab.id_row)
                 SQLCommandHandler().router(parsed_tokens, tables, indexes)
+
+            if tab.pager is None:
                 file_path = os.path.join(
                     exec_path, ConfigManager.get_data_dir(), f"{k}{tbl_ext}"
                 )
-                with open(file_path, "wb") as f:
-                    f.write(tab.object_to_bytes())
+                tab.pager = pager.open(file_path, tab.page_size, log, tab.compression)
+                tab.file_path = file_path
+                tab.log = log
+            tab.flush()
+            tab.mark_clean()
+            written = True
 
         for k, ndx in indexes.items():
+            if not ndx.dirty:
+                continue
+
             file_path = os.path.join(
                 exec_path, ConfigManager.get_data_dir(), f"{k}{ndx_ext}"
             )
-            with open(file_path, "wb") as f:
-                f.write(ndx.object_to_bytes())
+            # Indexes are serialized whole, only pages that differ are logged.
+            # A new index file is compressed like its table's.
+            ndx_bytes = memoryview(ndx.object_to_bytes())
+            n_pages = len(ndx_bytes) // ndx.page_size
+            codec = ndx.table.compression if ndx.table is not None else None
+            pgr = pager.open(file_path, ndx.page_size, log, codec)
+            for page_num in range(n_pages):
+                page = ndx_bytes[page_num * ndx.page_size:(page_num + 1) * ndx.page_size]
+                if pgr.read_page(page_num) != page:
+                    pgr.write_page(page_num, page)
+            pgr.truncate(n_pages)
+            pgr.close()
+            ndx.file_path = file_path
+            ndx.log = log
+            ndx.dirty = False
+            written = True
+
+        log.commit()
+
+        return written
+
+    @staticmethod
+    def release_cold(tables, indexes) -> int:
+        """
+        Let go of the least recently used tables and indexes beyond the
+        configured number kept open. They are read back from their files
+        the next time a statement uses them.
+
+        Returns the number released.
+        """
+        limit = ConfigManager.get_open_tables()
+        released = 0
+        # The catalog is read by almost every statement, it always stays open.
+        user_tables = [v for k, v in tables.items() if k not in {"system_tables", "system_columns"}]
+
+        for objs in (user_tables, indexes.values()):
+            open_objs = sorted(
+                (obj for obj in objs if obj.file_path is not None and obj.is_open()),
+                key=lambda obj: obj.last_used,
+                reverse=True,
+            )
+            for obj in open_objs[limit:]:
+                released += obj.release()
+
+        return released
 
     @staticmethod
     def help():
         help = [
             "\nclear;  # Clear screen",
             "SHOW TABLES; # List all tables currently in database",
-            "INSERT INTO TABLE (<column list>) <table> VALUES (<value list>) # Insert data into a particular table",
-            "CREATE TABLE <table> (column datatype constraint); # create a new table in the database",
+            "INSERT INTO TABLE (<column list>) <table> VALUES (<value list>)[, (<value list>) ...] # Insert one or more rows into a particular table",
+            "CREATE TABLE <table> (column datatype constraint) [WITH (page_size=N, compression=zlib)]; # create a new table in the database",
             "CREATE INDEX <table> (column>); # Create an index on a column",
             "SELECT <column list | *> FROM <table> <WHERE condition>; # sql_query_parser data from the database",
             "UPDATE <table> SET <set directives> <WHERE condition>;  # Update data in the tables",
             "DELETE FROM TABLE <table> <WHERE condition> # Delete data from a table",
             "DROP TABLE <table>; # Delete table from database",
             "DROP INDEX <table> (column>); # Delete an index on a column",
+            "VACUUM [<table>] [RENUMBER]; # Repack a table, or every table, and reclaim the pages of deleted rows",
             "exit; # Exit Program",
         ]
         print("\n".join(help))
@@ -148,32 +209,34 @@ class database_manager:
         if not os.path.exists(data_dir):
             os.makedirs(data_dir)
 
+        # Bring the files up to date with whatever the last run committed.
+        log = write_ahead_log.get()
+        log.recover()
+
         if os.path.exists(system_tables) and os.path.exists(system_columns):
-            with open(system_tables, "rb") as f:
-                OutputFormat.disable_stdout()
-                table = Table.bytes_to_object(
-                    f.read(),
-                    ConfigManager.get_page_size(),
-                    2,
-                    create_db.system_tables_column_data(),
-                    "system_tables",
-                )
-                OutputFormat.enable_stdout()
-                tables["system_tables"] = table
-                f.close()
-
-            with open(system_columns, "rb") as f:
-                OutputFormat.disable_stdout()
-                table = Table.bytes_to_object(
-                    f.read(),
-                    ConfigManager.get_page_size(),
-                    11,
-                    create_db.system_columns_column_data(),
-                    "system_columns",
-                )
-                OutputFormat.enable_stdout()
-                tables["system_columns"] = table
-                f.close()
+            pgr = pager.open(system_tables, ConfigManager.get_page_size(), log)
+            OutputFormat.disable_stdout()
+            table = Table.from_pager(
+                pgr,
+                ConfigManager.get_page_size(),
+                2,
+                create_db.system_tables_column_data(),
+                "system_tables",
+            )
+            OutputFormat.enable_stdout()
+            tables["system_tables"] = table
+
+            pgr = pager.open(system_columns, ConfigManager.get_page_size(), log)
+            OutputFormat.disable_stdout()
+            table = Table.from_pager(
+                pgr,
+                ConfigManager.get_page_size(),
+                11,
+                create_db.system_columns_column_data(),
+                "system_columns",
+            )
+            OutputFormat.enable_stdout()
+            tables["system_columns"] = table
 
             pdict = SQLQueryParser(
                 "select id_row from system_tables where table_name = 'system_tables';"
@@ -190,12 +253,28 @@ class database_manager:
             tables["system_tables"].id_row = table_rec_count[-1][-1]
             tables["system_columns"].id_row = col_rec_count[-1][-1]
 
-            pdict = SQLQueryParser("show tables;").parse()[0]
+            # Only the catalog is read at startup. Every other table and
+            # index is registered unopened and read on first use.
+            pdict = SQLQueryParser(
+                "select table_name, page_size, id_row from system_tables;"
+            ).parse()[0]
             pdict["ret_mode"] = True
-            table_names = command_handler.router(pdict, tables, indexes)
-            for t in table_names:
-                table_name = t[-1]
+            table_rows = command_handler.router(pdict, tables, indexes)
+
+            pdict = SQLQueryParser(
+                "select table_name, column_name, data_type, column_position, "
+                "is_nullable, column_key from system_columns;"
+            ).parse()[0]
+            pdict["ret_mode"] = True
+            column_rows = command_handler.router(pdict, tables, indexes)
+
+            cdata_lists = {}
+            for rec in column_rows:
+                cdata_lists.setdefault(rec[0], []).append(rec[1:])
+
+            for table_name, page_size, rec_count in table_rows:
                 if table_name not in tables:
+                    cdata_list = sorted(cdata_lists.get(table_name, []), key=lambda x: x[2])
                     table_name = table_name.lower()
                     table_path = os.path.join(
                         exec_path,
@@ -203,11 +282,6 @@ class database_manager:
                         f"{table_name}{tbl_ext}",
                     )
 
-                    cdata = SystemTable.parse_column_data(table_name)
-                    cdata["ret_mode"] = True
-                    cdata_list = command_handler.router(cdata, tables, indexes)
-                    cdata_list.sort(key=lambda x: x[2])
-
                     column_data = {
                         "column_names": [rec[0] for rec in cdata_list],
                         "data_types": [rec[1] for rec in cdata_list],
@@ -215,33 +289,22 @@ class database_manager:
                         "column_key_types": [rec[4] for rec in cdata_list],
                     }
 
-                    tdata = SystemTable.parse_table_data(table_name)
-                    tdata["ret_mode"] = True
-                    output = command_handler.router(tdata, tables, indexes)
-
-                    rec_count = 0
-
-                    if output:
-                        page_size, rec_count = output[0]
-
-                    with open(table_path, "rb") as f:
-                        OutputFormat.disable_stdout()
-                        new_table = Table.bytes_to_object(
-                            f.read(), page_size, rec_count, column_data
-                        )
-                        OutputFormat.enable_stdout()
-                        tables[table_name] = new_table
+                    tables[table_name] = Table.from_catalog(
+                        table_path, int(page_size), int(rec_count), column_data,
+                        table_name, log
+                    )
         for filename in os.listdir(data_dir):
             file_path = os.path.join(data_dir, filename)
             if len(filename.split(".")) == 3:
                 table_name = filename.split(".")[0]
                 column_name = filename.split(".")[1]
                 ext = filename.split(".")[2]
-                if ext == ndx_ext[-3:]:
-                    with open(file_path, "rb") as f:
-                        OutputFormat.disable_stdout()
-                        new_index, count = Index.bytes_to_object(f.read(), page_size)
-                        new_index.id_row = count
-                        OutputFormat.enable_stdout()
-                        indexes[table_name + "." + column_name] = new_index
-                        tables[table_name].indexes[column_name] = new_index
+                # An index file can outlive its table's catalog entry when
+                # the log was cut before the CREATE TABLE committed.
+                if ext == ndx_ext[-3:] and table_name in tables:
+                    new_index = Index.from_catalog(
+                        file_path, tables[table_name].page_size, log
+                    )
+                    new_index.table = tables[table_name]
+                    indexes[table_name + "." + column_name] = new_index
+                    tables[table_name].indexes[column_name] = new_index
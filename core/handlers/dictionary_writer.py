@@ -0,0 +1,77 @@
+from dataclasses import dataclass, field
+from struct import Struct
+from typing import List
+from core.elements.page_type import page_type
+from core.config.config_manager import ConfigManager
+
+
+@dataclass
+class dictionary_writer:
+    """
+    Class to handle writing dictionary pages, the chain holding a table's
+    text_dictionary.
+
+    Page layout: type (1), unused (1), entry count (2), next page of the
+    chain (4), then the entries: column (1), value length (1), value.
+
+    Attributes:
+    - page_number (int): The page number.
+    - next_page (int): Page holding the following entries, NO_PAGE on the
+      last page of the chain.
+    - entries (List[tuple]): (column, value) pairs stored in this page.
+    - page_size (int): Page size obtained from config manager.
+    """
+
+    HEADER_FORMAT = Struct(">BxHI")
+    ENTRY_FORMAT = Struct(">BB")
+    NO_PAGE = 0xFFFFFFFF
+
+    page_number: int
+    next_page: int = NO_PAGE
+    entries: List[tuple] = field(default_factory=list)
+    page_size: int = ConfigManager.get_page_size()
+
+    def object_to_bytes(self) -> bytes:
+        body = []
+        for col, value in self.entries:
+            data = value.encode()
+            body.append(self.ENTRY_FORMAT.pack(col, len(data)))
+            body.append(data)
+
+        header = self.HEADER_FORMAT.pack(
+            page_type.dictionary_page, len(self.entries), self.next_page
+        )
+        body = b"".join(body)
+        padding = bytes(self.page_size - len(header) - len(body))
+        return b"".join([header, body, padding])
+
+    @classmethod
+    def bytes_to_object(cls, byte_stream: bytes, pg_num: int):
+        _, count, next_page = cls.HEADER_FORMAT.unpack_from(byte_stream)
+        pos = cls.HEADER_FORMAT.size
+        entries = []
+        for _ in range(count):
+            col, length = cls.ENTRY_FORMAT.unpack_from(byte_stream, pos)
+            pos += cls.ENTRY_FORMAT.size
+            entries.append((col, bytes(byte_stream[pos:pos + length]).decode()))
+            pos += length
+
+        return cls(pg_num, next_page, entries, len(byte_stream))
+
+    @classmethod
+    def pack(cls, entries: List[tuple], page_size: int) -> List[int]:
+        """
+        Split entries, in order, across pages of page_size.
+
+        Returns the index of the first entry of each page.
+        """
+        capacity = page_size - cls.HEADER_FORMAT.size
+        starts, used = [0], 0
+        for i, (_, value) in enumerate(entries):
+            size = cls.ENTRY_FORMAT.size + len(value.encode())
+            if used + size > capacity:
+                starts.append(i)
+                used = 0
+            used += size
+
+        return starts
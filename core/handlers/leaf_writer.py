@@ -1,11 +1,9 @@
-from collections import deque
 from dataclasses import dataclass, field
-import io
+from struct import Struct
 from typing import Any, List
-import numpy as np
 from core.elements.b_plus_node import b_plus_node
 from core.elements.b_tree_node import b_tree_node
-from core.elements.data_pointer import data_pointer
+from core.elements.packed_columns import packed_columns
 from core.elements.page_header import page_header
 from core.elements.record import record
 from core.config.config_manager import ConfigManager
@@ -22,98 +20,97 @@ class leaf_writer:
     - offsets (List[bytes]): Offsets list.
     - records (List[record]): List of records.
     - page_size (int): Page size obtained from config manager.
+    - pack (bool): Whether the page may store its integer and date columns
+      as a packed_columns block.
     """
 
+    ROW_ID_FORMAT = Struct(">I")
+    OFFSET_FORMAT = Struct(">H")
+
     page_number: int
     header: page_header = field(default_factory=page_header.default_header)
     offsets: List[bytes] = field(default_factory=list)
     records: List[record] = field(default_factory=list)
     page_size: int = ConfigManager.get_page_size()
+    pack: bool = False
 
     def object_to_bytes(self):
-        self.offsets = deque()
-        cell_bytes_ll = deque()
-        num_cells = np.uint16(0)
-
-        data_size = np.uint16(0)
-
-        for record in self.records:
-            num_cells += np.uint16(1)
-            cell = record.object_to_bytes()
-            cell_size = len(cell)
-
-            data_size = data_size + np.uint16(cell_size)
-            self.header.data_start = self.page_size - data_size
-            offset = self.int_object_to_bytes(self.header.data_start, 2)
-            self.offsets.append(offset)
-            cell_bytes_ll.appendleft(cell)
-
-        self.header.num_cells = num_cells
-        header_bytes = self.header.object_to_bytes()
-        offset_bytes = b"".join(self.offsets)
-        cell_bytes = b"".join(cell_bytes_ll)
-        padding_len = (
-            self.page_size - len(header_bytes) - len(offset_bytes) - len(cell_bytes)
-        )
-
-        padding = self.int_object_to_bytes(0, 1) * padding_len
-        self.offsets = []
-
-        byte_stream = b"".join([header_bytes, offset_bytes, padding, cell_bytes])
-
-        return byte_stream
+        return bytes(self.into(bytearray(self.page_size)))
+
+    def into(self, buffer: bytearray) -> memoryview:
+        """
+        Encode the page into buffer, page_size bytes reused from one page to
+        the next, and return a view of it. Cells are copied in from the
+        records' encoded bytes, offsets and header are packed in place:
+        nothing is allocated per cell.
+        """
+        view = memoryview(buffer)
+        block = packed_columns.from_records(self.records) if self.pack else None
+        self.header.flags = page_header.PACKED_COLUMNS if block is not None else 0
+        packed = block.ordinals if block is not None else ()
+
+        floor = 16 + 2 * len(self.records)
+        if block is not None:
+            block_bytes = block.object_to_bytes()
+            view[floor:floor + len(block_bytes)] = block_bytes
+            floor += len(block_bytes)
+
+        data_start = self.page_size
+        for i, record in enumerate(self.records):
+            data_start = record.cell_into(view, data_start, packed)
+            if data_start < floor:
+                raise ValueError(
+                    f"Records of page {self.page_number} need more than {self.page_size} bytes"
+                )
+            self.OFFSET_FORMAT.pack_into(buffer, 16 + 2 * i, data_start)
+
+        page_header.clear(view, floor, data_start)
+        self.header.num_cells = len(self.records)
+        if self.records:
+            self.header.data_start = data_start
+        self.header.pack_into(buffer)
+
+        return view
 
     def to_bpnode(self) -> b_plus_node:
         x = b_plus_node(True, None)
-        x.keys = []
-
-        for rec in self.records:
-            dp = data_pointer(record.get_id, rec)
-            x.keys.append(dp)
-
-        x.keys.sort(key=data_pointer.get_id)
+        x.keys = sorted(self.records, key=record.get_id)
         return x
 
     def to_bnode(self) -> b_tree_node:
         x = b_tree_node(True)
-        x.keys = []
-
-        for rec in self.records:
-            dp = data_pointer(record.get_id, rec)
-            x.keys.append(dp)
-
-        x.keys.sort(key=data_pointer.get_id)
+        x.keys = sorted(self.records, key=record.get_id)
         return x
 
     @classmethod
-    def bytes_to_object(cls, byte_stream: bytes, pg_num: int):
-        raw = io.BytesIO(byte_stream)
-        read_buff = io.BufferedRandom(raw)
-
-        header_bytes = read_buff.read(16)
-        header = page_header.bytes_to_object(header_bytes)
-        num_cells = header.num_cells
-
-        read_buff.seek(16)
-
-        offsets_paired = list()
-
-        for _ in range(num_cells):
-            cell_offset_bytes = read_buff.read(2)
-            cell_offset_int = cls.bytes_to_int(cell_offset_bytes)
-            offsets_paired.append((cell_offset_bytes, cell_offset_int))
-
-        records = list()
-        for _, ci in offsets_paired:
-            read_buff.seek(ci)
-            rec_len = cls.bytes_to_int(read_buff.read(2))
-            read_buff.seek(ci)
-            record_bytes = read_buff.read(6 + rec_len)
-            rec = record.bytes_to_object(record_bytes)
-            records.append(rec)
+    def bytes_to_object(cls, byte_stream: bytes, pg_num: int, words: List[str] = None):
+        # byte_stream may be a memoryview over a mapped page, the header,
+        # offsets and cells are all read in place from it. words is the
+        # owning table's dictionary, for coded TEXT values.
+        header = page_header.bytes_to_object(byte_stream)
+        offsets = page_header.cell_offsets(byte_stream, header.num_cells)
+        records = [record.bytes_to_object(byte_stream, ci, words) for ci in offsets]
+        if header.flags & page_header.PACKED_COLUMNS:
+            packed_columns.bytes_to_object(byte_stream, offsets).fill(records)
 
         return cls(pg_num, header, list(), records)
 
+    @classmethod
+    def bounding_ids(cls, byte_stream: bytes):
+        """
+        Row ids of the first and last cell of a leaf page, read straight from
+        the offset array without decoding any record. None for an empty page.
+        """
+        num_cells = page_header.bytes_to_object(byte_stream).num_cells
+        if num_cells == 0:
+            return None
+
+        offsets = page_header.cell_offsets(byte_stream, num_cells)
+        return (
+            cls.ROW_ID_FORMAT.unpack_from(byte_stream, offsets[0] + 2)[0],
+            cls.ROW_ID_FORMAT.unpack_from(byte_stream, offsets[-1] + 2)[0],
+        )
+
     @classmethod
     def int_object_to_bytes(cls, int_like_val: Any, size: int):
         try:
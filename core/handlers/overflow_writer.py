@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from struct import Struct
+from core.elements.page_type import page_type
+from core.config.config_manager import ConfigManager
+
+
+@dataclass
+class overflow_writer:
+    """
+    Class to handle writing overflow pages, the links of the chains holding
+    values spilled out of leaf cells (see overflow_text).
+
+    Page layout: type (1), unused (1), payload bytes used (2), next page of
+    the chain (4), then the payload.
+
+    Attributes:
+    - page_number (int): The page number.
+    - next_page (int): Page holding the rest of the value, NO_PAGE on the
+      last page of a chain.
+    - payload (bytes): The part of the value stored in this page.
+    - page_size (int): Page size obtained from config manager.
+    """
+
+    HEADER_FORMAT = Struct(">BxHI")
+    NO_PAGE = 0xFFFFFFFF
+
+    page_number: int
+    next_page: int = NO_PAGE
+    payload: bytes = b""
+    page_size: int = ConfigManager.get_page_size()
+
+    def object_to_bytes(self) -> bytes:
+        header = self.HEADER_FORMAT.pack(
+            page_type.overflow_page, len(self.payload), self.next_page
+        )
+        padding = bytes(self.page_size - len(header) - len(self.payload))
+        return b"".join([header, self.payload, padding])
+
+    @classmethod
+    def bytes_to_object(cls, byte_stream: bytes, pg_num: int):
+        _, used, next_page = cls.HEADER_FORMAT.unpack_from(byte_stream)
+        start = cls.HEADER_FORMAT.size
+        return cls(pg_num, next_page, bytes(byte_stream[start:start + used]), len(byte_stream))
+
+    @classmethod
+    def next_page_of(cls, byte_stream: bytes) -> int:
+        return cls.HEADER_FORMAT.unpack_from(byte_stream)[2]
+
+    @classmethod
+    def capacity(cls, page_size: int) -> int:
+        # Payload bytes one overflow page can hold.
+        return page_size - cls.HEADER_FORMAT.size
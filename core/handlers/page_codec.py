@@ -0,0 +1,63 @@
+from __future__ import annotations
+import zlib
+from typing import Dict, List
+
+
+class page_codec:
+    """
+    Compression applied to every page of a compressed table or index file,
+    see compressed_pager.
+
+    A file records the name of its codec in its header and is read back
+    with the codec registered under that name, so a codec's output must
+    stay readable for as long as files written with it exist. New codecs
+    subclass page_codec and are made available with register().
+
+    Attributes:
+    - name (str): Name the codec is registered and recorded under, at most
+      16 bytes.
+    """
+
+    name = None
+    _codecs: Dict[str, type] = {}
+
+    @classmethod
+    def register(cls, codec_cls: type) -> type:
+        cls._codecs[codec_cls.name] = codec_cls
+        return codec_cls
+
+    @classmethod
+    def get(cls, name: str) -> page_codec:
+        if name not in cls._codecs:
+            raise ValueError(f"Compression {name} not one of {cls.names()}")
+        return cls._codecs[name]()
+
+    @classmethod
+    def names(cls) -> List[str]:
+        return sorted(cls._codecs)
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def decompress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+
+@page_codec.register
+class zlib_codec(page_codec):
+    """
+    DEFLATE through the standard library's zlib, without the zlib header
+    and checksum: frames carry their own CRC.
+    """
+
+    name = "zlib"
+
+    def __init__(self, level: int = 6) -> None:
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data, -zlib.MAX_WBITS)
@@ -1,6 +1,5 @@
-from collections import deque
 from dataclasses import dataclass, field
-import io
+from struct import Struct
 from typing import Any, List
 
 import numpy as np
@@ -24,6 +23,8 @@ class page_writer:
     - page_size (int): Page size obtained from config manager.
     """
 
+    OFFSET_FORMAT = Struct(">H")
+
     page_number: int
     header: page_header = field(default_factory=page_header.default_header)
     offsets: List[bytes] = field(default_factory=list)
@@ -41,41 +42,43 @@ class page_writer:
         Returns:
         - Byte stream representing object attributes.
         """
-        self.offsets = deque()
-        cell_bytes_ll = deque()
-        num_cells = np.uint16(0)
-
-        data_size = np.uint16(0)
+        return bytes(self.into(bytearray(self.page_size), parent_page_num))
 
-        for key in self.keys:
-            num_cells += np.uint16(1)
-            cell = key.object_to_bytes()
-            cell_size = len(cell)
+    def into(self, buffer: bytearray, parent_page_num: int) -> memoryview:
+        """
+        Encode the page into buffer, without allocating per cell.
 
-            data_size = data_size + np.uint16(cell_size)
-            self.header.data_start = self.page_size - data_size
-            offset = self.int_object_to_bytes(self.header.data_start, 2)
-            self.offsets.append(offset)
-            cell_bytes_ll.appendleft(cell)
+        Parameters:
+        - buffer (bytearray): page_size bytes, reused from one page to the
+          next.
+        - parent_page_num (int): Parent page number.
 
-        self.header.num_cells = num_cells
+        Returns:
+        - View of buffer holding the page.
+        """
+        view = memoryview(buffer)
+        floor = 16 + 2 * len(self.keys)
+        data_start = self.page_size
+
+        for i, key in enumerate(self.keys):
+            data_start -= data_cell.CELL_FORMAT.size
+            if data_start < floor:
+                raise ValueError(
+                    f"Cells of page {self.page_number} need more than {self.page_size} bytes"
+                )
+            key.pack_into(buffer, data_start)
+            self.OFFSET_FORMAT.pack_into(buffer, 16 + 2 * i, data_start)
+
+        page_header.clear(view, floor, data_start)
+        self.header.num_cells = len(self.keys)
+        if self.keys:
+            self.header.data_start = data_start
         self.header.pagetype = page_type.table_interior_page
         self.header.parent = np.uint32(parent_page_num)
         self.header.right_relatve = np.uint32(self.last_child_pg)
+        self.header.pack_into(buffer)
 
-        header_bytes = self.header.object_to_bytes()
-        offset_bytes = b"".join(self.offsets)
-        cell_bytes = b"".join(cell_bytes_ll)
-        padding_len = (
-            self.page_size - len(header_bytes) - len(offset_bytes) - len(cell_bytes)
-        )
-
-        padding = self.int_object_to_bytes(0, 1) * padding_len
-        self.offsets = []
-
-        byte_stream = b"".join([header_bytes, offset_bytes, padding, cell_bytes])
-
-        return byte_stream
+        return view
 
     @classmethod
     def bytes_to_object(cls, byte_stream: bytes, pg_num: int):
@@ -83,36 +86,18 @@ class page_writer:
         Convert bytes to object attributes.
 
         Parameters:
-        - byte_stream (bytes): Byte stream to convert.
+        - byte_stream (bytes): Page to convert, any buffer such as a
+          memoryview over a mapped file; it is parsed in place.
         - pg_num (int): Page number.
 
         Returns:
         - Page Writer object with parsed attributes.
         """
-        raw = io.BytesIO(byte_stream)
-        read_buff = io.BufferedRandom(raw)
-
-        header_bytes = read_buff.read(16)
-        header = page_header.bytes_to_object(header_bytes)
-        num_cells = header.num_cells
-
-        read_buff.seek(16)
-
-        offsets_paired = list()
-
-        for _ in range(num_cells):
-            cell_offset_bytes = read_buff.read(2)
-            cell_offset_int = cls.bytes_to_int(cell_offset_bytes)
-            offsets_paired.append((cell_offset_bytes, cell_offset_int))
-
-        router_cells = list()
-        for _, ci in offsets_paired:
-            read_buff.seek(ci)
-            cell_bytes = read_buff.read(8)
-            rec = data_cell.bytes_to_object(cell_bytes)
-            router_cells.append(rec)
+        header = page_header.bytes_to_object(byte_stream)
+        offsets = page_header.cell_offsets(byte_stream, header.num_cells)
+        router_cells = [data_cell.bytes_to_object(byte_stream, ci) for ci in offsets]
 
-        return InternalPageWriter(
+        return cls(
             pg_num, header, list(), router_cells, header.right_relatve
         )
 
@@ -0,0 +1,386 @@
+from __future__ import annotations
+import mmap
+import os
+import zlib
+from struct import Struct
+from core.handlers.page_codec import page_codec
+
+
+class pager:
+    """
+    Fixed-size page access to a single table or index file.
+
+    Pages are addressed by number and live at page_num * page_size, so a
+    change to one node is persisted by rewriting that page in place instead
+    of the whole file.
+
+    Reads are served from a read-only memory map of the file: read_page and
+    read_all hand out memoryview slices of the mapping, so parsing a page
+    copies nothing until a value is actually decoded. Writes still go
+    through the file descriptor and are visible in the mapping straight
+    away; the mapping is only rebuilt when the file has grown past it or
+    has been truncated.
+
+    With a write_ahead_log attached, writes and truncations go to the log
+    instead of the file, and reads prefer the log's copy of a page until a
+    checkpoint has folded it back into the file.
+
+    Attributes:
+    - file_path (str): Path of the backing file.
+    - page_size (int): Size in bytes of every page in the file.
+    - fd (int): OS level file descriptor, kept open between statements.
+    - log (write_ahead_log): Log that writes are redirected to, if any.
+    - name (str): File name the log knows this file by.
+    - codec (page_codec): Codec the pages are compressed with, None for a
+      file of plain pages.
+    """
+
+    codec = None
+
+    def __init__(self, file_path: str, page_size: int, log=None) -> None:
+        self.file_path = file_path
+        self.page_size = page_size
+        self.name = os.path.basename(file_path)
+        self.log = log
+        if log is not None:
+            log.attach(self)
+        self.fd = os.open(
+            file_path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644
+        )
+        self._map = None
+        self._view = memoryview(b"")
+
+    @classmethod
+    def open(cls, file_path: str, page_size: int, log=None, codec: str = None) -> pager:
+        """
+        Pager for file_path, a compressed_pager when the file was written
+        compressed. codec only decides the format of a file that is still
+        empty, an existing file keeps the one it was written in.
+        """
+        if compressed_pager.is_compressed(file_path, log):
+            return compressed_pager(file_path, page_size, log)
+        if codec is not None and _file_size(file_path, log) == 0:
+            return compressed_pager(file_path, page_size, log, page_codec.get(codec))
+        return cls(file_path, page_size, log)
+
+    def num_pages(self) -> int:
+        size = os.fstat(self.fd).st_size
+        if self.log is not None:
+            size = self.log.file_size(self.name, size)
+        return size // self.page_size
+
+    def read_page(self, page_num: int) -> memoryview:
+        offset = page_num * self.page_size
+        if self.log is not None:
+            logged = self.log.read_page(self.name, offset, self.page_size)
+            if logged is not None:
+                return memoryview(logged)
+        return self.view(offset + self.page_size)[offset:offset + self.page_size]
+
+    def read_all(self) -> memoryview:
+        n_pages = self.num_pages()
+        if self.log is not None and self.log.has_pages(self.name):
+            return memoryview(b"".join(map(self.read_page, range(n_pages))))
+        size = n_pages * self.page_size
+        return self.view(size)[:size]
+
+    def view(self, end: int = 0) -> memoryview:
+        """
+        Memoryview over the whole file, remapped first if the current
+        mapping ends before byte `end`.
+        """
+        if len(self._view) < end:
+            self._remap()
+        return self._view
+
+    def write_page(self, page_num: int, page_bytes: bytes) -> None:
+        if len(page_bytes) != self.page_size:
+            raise ValueError(
+                f"Page {page_num} is {len(page_bytes)} bytes, expected {self.page_size}"
+            )
+        if self.log is not None:
+            self.log.append_page(self.name, page_num * self.page_size, page_bytes)
+        else:
+            self._pwrite(page_bytes, page_num * self.page_size)
+
+    def free_page(self, page_num: int) -> None:
+        # A zeroed page has no valid page type, so scans skip it.
+        self.write_page(page_num, bytes(self.page_size))
+
+    def truncate(self, n_pages: int) -> None:
+        if self.num_pages() != n_pages:
+            if self.log is not None:
+                self.log.append_truncate(self.name, n_pages * self.page_size)
+            else:
+                self._unmap()
+                os.ftruncate(self.fd, n_pages * self.page_size)
+
+    def sync(self) -> None:
+        if self.log is not None:
+            self.log.commit()
+        else:
+            os.fsync(self.fd)
+
+    def invalidate(self) -> None:
+        # The file is about to change underneath the mapping.
+        self._unmap()
+
+    def close(self) -> None:
+        self._unmap()
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def _remap(self) -> None:
+        self._unmap()
+        size = os.fstat(self.fd).st_size
+        if size:
+            self._map = mmap.mmap(self.fd, size, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+
+    def _unmap(self) -> None:
+        # Slices handed out earlier keep the old mapping alive until they are
+        # dropped, in which case it is closed when collected instead.
+        self._view = memoryview(b"")
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass
+            self._map = None
+
+    def _pwrite(self, data: bytes, offset: int) -> None:
+        if hasattr(os, "pwrite"):
+            os.pwrite(self.fd, data, offset)
+        else:
+            os.lseek(self.fd, offset, os.SEEK_SET)
+            os.write(self.fd, data)
+
+
+class compressed_pager(pager):
+    """
+    Page access to a file whose pages are stored compressed.
+
+    The file is cut into sectors of SECTOR bytes. Sector 0 holds the file
+    header and every other page is stored as one frame: a frame header
+    followed by the page as compressed by the file's codec, or the plain
+    page when that is no smaller, padded to a whole number of sectors.
+    Pages of zeros, freed pages, take no frame at all. The page map, page
+    number to the frame's sectors, is kept in memory so random access still
+    reads a single frame; it is rebuilt at open by walking the frames,
+    which carry their page number and a CRC of their content.
+
+    A rewritten page stays in its sectors while it fits and moves to the
+    first free run that holds it otherwise. Frames that move or are dropped
+    have their header zeroed, so the frames of a file at a commit are all
+    live. Frames are written through the log like plain pages, which
+    applies them in the order they were logged, see write_ahead_log.
+
+    Header layout: magic (4), page size (4), page count (4), codec name
+    length (1), codec name. Frame layout: page number (4), compressed (1),
+    stored length (2), CRC32 of the rest of the frame (4), stored page.
+
+    Attributes:
+    - count (int): Number of pages in the file.
+    - frames (dict): Page number -> (first sector, sectors, frame length)
+      of every page that has a frame.
+    - used (bytearray): One byte per sector of the file, 1 when it is in
+      use.
+    - compacted (int): Sectors in use up to the last frame after the last
+      compaction.
+    """
+
+    SECTOR = 64
+    MAGIC = b"DBZ\x01"
+    HEADER_FORMAT = Struct(">4sIIB")
+    FRAME_FORMAT = Struct(">IBHI")
+
+    def __init__(self, file_path: str, page_size: int, log=None,
+                 codec: page_codec = None) -> None:
+        super().__init__(file_path, page_size, log)
+        self.codec = codec
+        self.count = 0
+        self.frames = {}
+        # Sector 0 is the header.
+        self.used = bytearray(b"\x01")
+        self.compacted = 0
+        self.zero_page = bytes(page_size)
+        self.load()
+
+    @classmethod
+    def is_compressed(cls, file_path: str, log=None) -> bool:
+        head = log.read_page(os.path.basename(file_path), 0, cls.SECTOR) if log else None
+        if head is None and os.path.exists(file_path):
+            with open(file_path, "rb") as file:
+                head = file.read(len(cls.MAGIC))
+        return head is not None and bytes(head[:len(cls.MAGIC)]) == cls.MAGIC
+
+    def load(self) -> None:
+        size = _file_size(self.file_path, self.log)
+        data = bytes(self.view(size)[:size])
+        if self.log is not None:
+            data = self.log.read_file(self.name, data)
+        if not data:
+            return
+
+        magic, page_size, self.count, name_len = self.HEADER_FORMAT.unpack_from(data)
+        if magic != self.MAGIC or page_size != self.page_size:
+            raise ValueError(f"{self.file_path} is not a compressed file of {self.page_size} byte pages")
+        name_start = self.HEADER_FORMAT.size
+        self.codec = page_codec.get(data[name_start:name_start + name_len].decode())
+
+        n_sectors = -(-len(data) // self.SECTOR)
+        self.used = bytearray(n_sectors)
+        self.used[0] = 1
+        sector = 1
+        while sector < n_sectors:
+            frame = self.parse_frame(data, sector)
+            if frame is None:
+                sector += 1
+                continue
+            page_num, length = frame
+            span = -(-length // self.SECTOR)
+            self.frames[page_num] = (sector, span, length)
+            self.used[sector:sector + span] = b"\x01" * span
+            sector += span
+
+    def parse_frame(self, data: bytes, sector: int):
+        # (page number, frame length) of a live frame starting at sector.
+        start = sector * self.SECTOR
+        if start + self.FRAME_FORMAT.size > len(data):
+            return None
+        page_num, _, length, crc = self.FRAME_FORMAT.unpack_from(data, start)
+        end = start + self.FRAME_FORMAT.size + length
+        if page_num >= self.count or length > self.page_size or end > len(data):
+            return None
+        if zlib.crc32(data[start + self.FRAME_FORMAT.size:end],
+                      zlib.crc32(data[start:start + self.FRAME_FORMAT.size - 4])) != crc:
+            return None
+        return page_num, end - start
+
+    def num_pages(self) -> int:
+        return self.count
+
+    def read_page(self, page_num: int) -> memoryview:
+        entry = self.frames.get(page_num)
+        if entry is None:
+            return memoryview(self.zero_page)
+
+        sector, span, length = entry
+        frame = self.read_sectors(sector, span)
+        _, compressed, stored, _ = self.FRAME_FORMAT.unpack_from(frame)
+        page = frame[self.FRAME_FORMAT.size:self.FRAME_FORMAT.size + stored]
+        return memoryview(self.codec.decompress(page) if compressed else page)
+
+    def read_all(self) -> memoryview:
+        return memoryview(b"".join(map(self.read_page, range(self.count))))
+
+    def read_sectors(self, sector: int, span: int) -> memoryview:
+        offset, size = sector * self.SECTOR, span * self.SECTOR
+        if self.log is not None:
+            logged = self.log.read_page(self.name, offset, size)
+            if logged is not None:
+                return memoryview(logged)
+        return self.view(offset + size)[offset:offset + size]
+
+    def write_page(self, page_num: int, page_bytes: bytes) -> None:
+        if len(page_bytes) != self.page_size:
+            raise ValueError(
+                f"Page {page_num} is {len(page_bytes)} bytes, expected {self.page_size}"
+            )
+
+        old = self.frames.pop(page_num, None)
+        if old is not None:
+            self.used[old[0]:old[0] + old[1]] = bytes(old[1])
+
+        if page_bytes == self.zero_page:
+            if old is not None:
+                self.write_sectors(old[0], bytes(self.SECTOR))
+        else:
+            stored = self.codec.compress(page_bytes)
+            compressed = len(stored) < self.page_size
+            if not compressed:
+                stored = bytes(page_bytes)
+            head = self.FRAME_FORMAT.pack(page_num, compressed, len(stored), 0)[:-4]
+            crc = zlib.crc32(stored, zlib.crc32(head))
+            frame = b"".join([head, crc.to_bytes(4, "big"), stored])
+            span = -(-len(frame) // self.SECTOR)
+
+            if old is not None and span <= old[1]:
+                sector = old[0]
+            else:
+                sector = self.allocate(span)
+                if old is not None and old[0] != sector:
+                    self.write_sectors(old[0], bytes(self.SECTOR))
+            self.used[sector:sector + span] = b"\x01" * span
+            self.frames[page_num] = (sector, span, len(frame))
+            self.write_sectors(sector, frame + bytes(span * self.SECTOR - len(frame)))
+
+        if page_num >= self.count:
+            self.count = page_num + 1
+            self.write_header()
+
+    def allocate(self, span: int) -> int:
+        # First free run of span sectors, or the end of the file.
+        sector = self.used.find(bytes(span), 1)
+        if sector < 0:
+            sector = len(self.used.rstrip(b"\x00"))
+            self.used.extend(bytes(sector + span - len(self.used)))
+        return sector
+
+    def write_header(self) -> None:
+        name = self.codec.name.encode()
+        header = self.HEADER_FORMAT.pack(self.MAGIC, self.page_size, self.count, len(name)) + name
+        self.write_sectors(0, header + bytes(self.SECTOR - len(header)))
+
+    def write_sectors(self, sector: int, data: bytes) -> None:
+        if self.log is not None:
+            self.log.append_page(self.name, sector * self.SECTOR, data)
+        else:
+            self._pwrite(data, sector * self.SECTOR)
+
+    def truncate(self, n_pages: int) -> None:
+        if self.count != n_pages:
+            for page_num in [p for p in self.frames if p >= n_pages]:
+                sector, span, _ = self.frames.pop(page_num)
+                self.used[sector:sector + span] = bytes(span)
+                self.write_sectors(sector, bytes(self.SECTOR))
+            self.count = n_pages
+            self.write_header()
+
+        # Files at most half full are compacted, again once they have grown
+        # past the size the last compaction left them at.
+        if 2 * self.used.count(1) < len(self.used) and len(self.used) > self.compacted:
+            self.compact()
+
+        # Free sectors at the end of the file are given back.
+        del self.used[len(self.used.rstrip(b"\x00")):]
+        size = len(self.used) * self.SECTOR
+        if _file_size(self.file_path, self.log) > size:
+            if self.log is not None:
+                self.log.append_truncate(self.name, size)
+            else:
+                self._unmap()
+                os.ftruncate(self.fd, size)
+
+    def compact(self) -> None:
+        # Move frames from the end of the file into free runs before them.
+        by_sector = sorted(self.frames.items(), key=lambda item: item[1][0], reverse=True)
+        for page_num, (sector, span, length) in by_sector:
+            target = self.used.find(bytes(span), 1)
+            if target < 0 or target > sector:
+                continue
+            frame = bytes(self.read_sectors(sector, span))
+            self.used[sector:sector + span] = bytes(span)
+            self.used[target:target + span] = b"\x01" * span
+            self.write_sectors(sector, bytes(self.SECTOR))
+            self.write_sectors(target, frame)
+            self.frames[page_num] = (target, span, length)
+        self.compacted = len(self.used.rstrip(b"\x00"))
+
+
+def _file_size(file_path: str, log=None) -> int:
+    size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+    if log is not None:
+        size = log.file_size(os.path.basename(file_path), size)
+    return size
@@ -0,0 +1,341 @@
+import os
+import threading
+import weakref
+import zlib
+from struct import Struct
+from core.config.config_manager import ConfigManager
+
+
+class write_ahead_log:
+    """
+    Page level redo log shared by every table and index file of a database.
+
+    Pagers attached to the log never write their file directly. Every page
+    image and truncation is appended to the log instead, and each statement
+    ends with a COMMIT record. Until a checkpoint folds the log back into
+    the .tbl/.ndx files, attached pagers read their latest pages through an
+    in-memory index of the log.
+
+    Commits share fsyncs: the log is synced once group_commit statements
+    are waiting, or commit_delay seconds after the first of them, whichever
+    comes first. A crash can lose the statements of that last group, but
+    the files are never left in a partly written state: on startup
+    recover() replays only records followed by a COMMIT and drops the torn
+    tail.
+
+    Record layout: kind (1), name length (2), file offset (8), payload
+    length (4), file name, payload, then a CRC32 of everything before it.
+    A TRUNCATE record stores the new file size as its offset and has no
+    payload.
+
+    Attributes:
+    - path (str): Path of the log file.
+    - data_dir (str): Directory holding the files named in the log.
+    - fd (int): OS level file descriptor of the log.
+    - end (int): Bytes of the log already written to the file.
+    - buffer (bytearray): Records appended since the last commit.
+    - pages (dict): (file name, offset) -> (log offset, length) of the
+      latest image of every page not yet checkpointed.
+    - sizes (dict): File name -> [logical size, smallest size it was
+      truncated to, end of the furthest page written] since the last
+      checkpoint. The first two stay None until the file is truncated.
+    - pending (int): Commits written but not synced yet.
+    """
+
+    PAGE = 1
+    TRUNCATE = 2
+    COMMIT = 3
+
+    HEAD_FORMAT = Struct(">BHQI")
+    CRC_FORMAT = Struct(">I")
+
+    _shared = None
+
+    def __init__(self, path: str, group_commit: int = 8,
+                 commit_delay: float = 0.05, checkpoint_pages: int = 1024) -> None:
+        self.path = path
+        self.data_dir = os.path.dirname(path)
+        self.group_commit = group_commit
+        self.commit_delay = commit_delay
+        self.checkpoint_pages = checkpoint_pages
+        self.fd = os.open(
+            path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644
+        )
+        self.end = 0
+        self.buffer = bytearray()
+        self.pages = {}
+        self.sizes = {}
+        self.pending = 0
+        self.pagers = weakref.WeakSet()
+        self.lock = threading.RLock()
+        self.timer = None
+
+    @classmethod
+    def get(cls) -> "write_ahead_log":
+        path = os.path.join(
+            ConfigManager.get_exec_path(),
+            ConfigManager.get_data_dir(),
+            f"{ConfigManager.get_db_name()}{ConfigManager.get_wal_ext()}",
+        )
+        if cls._shared is not None and cls._shared.path != path:
+            cls._shared.close()
+        if cls._shared is None or cls._shared.fd is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            cls._shared = cls(
+                path,
+                ConfigManager.get_wal_group_commit(),
+                ConfigManager.get_wal_commit_delay(),
+                ConfigManager.get_wal_checkpoint_pages(),
+            )
+        return cls._shared
+
+    def attach(self, pgr) -> None:
+        self.pagers.add(pgr)
+
+    def append_page(self, name: str, offset: int, page_bytes: bytes) -> None:
+        with self.lock:
+            pos = self._append(self.PAGE, name, offset, page_bytes)
+            self._index_page(name, offset, pos, len(page_bytes))
+
+    def append_truncate(self, name: str, size: int) -> None:
+        with self.lock:
+            self._append(self.TRUNCATE, name, size, b"")
+            self._index_truncate(name, size)
+
+    def commit(self) -> None:
+        """
+        End the current statement. Its records reach the log file now, the
+        fsync is shared with the rest of the group.
+        """
+        with self.lock:
+            if not self._write_commit():
+                return
+
+            if self.pending >= self.group_commit or self.commit_delay <= 0:
+                self.sync()
+            elif self.timer is None:
+                self.timer = threading.Timer(self.commit_delay, self.sync)
+                self.timer.daemon = True
+                self.timer.start()
+
+            if len(self.pages) >= self.checkpoint_pages:
+                self.checkpoint()
+
+    def sync(self) -> None:
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if self.pending and self.fd is not None:
+                os.fsync(self.fd)
+            self.pending = 0
+
+    def read_page(self, name: str, offset: int, size: int):
+        """
+        Latest image of a page from the log, or None when the file itself is
+        current. Pages cut off by a truncation and not written since read
+        back as zeros.
+        """
+        with self.lock:
+            entry = self.pages.get((name, offset))
+            if entry is None:
+                floor = self.sizes.get(name, (None, None))[1]
+                if floor is not None and offset >= floor:
+                    return bytes(size)
+                return None
+
+            pos, length = entry
+            if pos >= self.end:
+                return bytes(self.buffer[pos - self.end:pos - self.end + length])
+            return _pread(self.fd, length, pos)
+
+    def file_size(self, name: str, physical_size: int) -> int:
+        size, floor, high = self.sizes.get(name, (None, None, 0))
+        if size is None:
+            # Only page writes so far, they can grow the file but not shrink it.
+            return max(physical_size, high)
+        return size
+
+    def has_pages(self, name: str) -> bool:
+        return name in self.sizes
+
+    def read_file(self, name: str, data: bytes) -> bytes:
+        """
+        Contents of file name with the log folded into data, the bytes of the
+        file itself, the way the next checkpoint will write them.
+        """
+        with self.lock:
+            size, floor, _ = self.sizes.get(name, (None, None, 0))
+            image = bytearray(data if floor is None else data[:floor])
+            for offset, pos, length in self._entries(name):
+                if pos >= self.end:
+                    payload = self.buffer[pos - self.end:pos - self.end + length]
+                else:
+                    payload = _pread(self.fd, length, pos)
+                image.extend(bytes(max(offset - len(image), 0)))
+                image[offset:offset + length] = payload
+            if size is not None:
+                del image[size:]
+                image.extend(bytes(size - len(image)))
+            return bytes(image)
+
+    def checkpoint(self) -> None:
+        """
+        Fold every committed page back into its file, sync the files and
+        empty the log.
+        """
+        with self.lock:
+            self._write_commit()
+            self.sync()
+
+            for pgr in list(self.pagers):
+                pgr.invalidate()
+
+            for name, (size, floor, _) in self.sizes.items():
+                file_path = os.path.join(self.data_dir, name)
+                fd = os.open(
+                    file_path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644
+                )
+                try:
+                    if floor is not None:
+                        os.ftruncate(fd, floor)
+                    for offset, pos, length in self._entries(name):
+                        _pwrite(fd, _pread(self.fd, length, pos), offset)
+                    if size is not None:
+                        os.ftruncate(fd, size)
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+
+            self.pages = {}
+            self.sizes = {}
+            os.ftruncate(self.fd, 0)
+            os.fsync(self.fd)
+            self.end = 0
+
+    def recover(self) -> int:
+        """
+        Replay the log left by the previous run into the files. Records after
+        the last COMMIT belong to a statement that never finished, they are
+        dropped along with anything torn or corrupt.
+
+        Returns the number of committed statements replayed.
+        """
+        with self.lock:
+            log = _pread(self.fd, os.fstat(self.fd).st_size, 0)
+            records, committed, replayed = [], 0, 0
+            pos = 0
+
+            while pos + self.HEAD_FORMAT.size <= len(log):
+                kind, name_len, offset, length = self.HEAD_FORMAT.unpack_from(log, pos)
+                body = pos + self.HEAD_FORMAT.size + name_len
+                stop = body + length
+                if kind not in (self.PAGE, self.TRUNCATE, self.COMMIT) \
+                        or stop + self.CRC_FORMAT.size > len(log) \
+                        or self.CRC_FORMAT.unpack_from(log, stop)[0] != zlib.crc32(log[pos:stop]):
+                    break
+
+                name = log[pos + self.HEAD_FORMAT.size:body].decode()
+                records.append((kind, name, offset, body, length))
+                if kind == self.COMMIT:
+                    committed = len(records)
+                    replayed += 1
+                pos = stop + self.CRC_FORMAT.size
+
+            for kind, name, offset, body, length in records[:committed]:
+                if kind == self.PAGE:
+                    self._index_page(name, offset, body, length)
+                elif kind == self.TRUNCATE:
+                    self._index_truncate(name, offset)
+
+            self.end = len(log)
+            self.checkpoint()
+            return replayed
+
+    def close(self) -> None:
+        with self.lock:
+            if self.fd is None:
+                return
+            self.checkpoint()
+            os.close(self.fd)
+            self.fd = None
+        if write_ahead_log._shared is self:
+            write_ahead_log._shared = None
+
+    def discard(self) -> None:
+        """
+        Drop the log without folding it back, used when the whole database is
+        being deleted.
+        """
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+            self.buffer = bytearray()
+            self.pages = {}
+            self.sizes = {}
+        if write_ahead_log._shared is self:
+            write_ahead_log._shared = None
+
+    def _write_commit(self) -> bool:
+        if not self.buffer:
+            return False
+        self._append(self.COMMIT, "", 0, b"")
+        _pwrite(self.fd, bytes(self.buffer), self.end)
+        self.end += len(self.buffer)
+        self.buffer = bytearray()
+        self.pending += 1
+        return True
+
+    def _entries(self, name: str) -> list:
+        # (offset, log offset, length) of the pages logged for name, in the
+        # order they were logged: writes of different lengths can overlap,
+        # the latest one wins.
+        return sorted(
+            ((offset, pos, length)
+             for (page_name, offset), (pos, length) in self.pages.items()
+             if page_name == name),
+            key=lambda entry: entry[1],
+        )
+
+    def _index_page(self, name: str, offset: int, pos: int, length: int) -> None:
+        self.pages[(name, offset)] = (pos, length)
+        state = self.sizes.setdefault(name, [None, None, 0])
+        state[2] = max(state[2], offset + length)
+        if state[0] is not None:
+            state[0] = max(state[0], offset + length)
+
+    def _index_truncate(self, name: str, size: int) -> None:
+        for key in [k for k in self.pages if k[0] == name and k[1] >= size]:
+            del self.pages[key]
+        state = self.sizes.setdefault(name, [None, None, 0])
+        state[0] = size
+        state[1] = size if state[1] is None else min(state[1], size)
+
+    def _append(self, kind: int, name: str, offset: int, payload: bytes) -> int:
+        # Returns the log offset the payload will live at.
+        name_b = name.encode()
+        rec = self.HEAD_FORMAT.pack(kind, len(name_b), offset, len(payload)) + name_b
+        payload_pos = self.end + len(self.buffer) + len(rec)
+        rec += payload
+        self.buffer += rec
+        self.buffer += self.CRC_FORMAT.pack(zlib.crc32(rec))
+        return payload_pos
+
+
+def _pread(fd: int, size: int, offset: int) -> bytes:
+    if hasattr(os, "pread"):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+def _pwrite(fd: int, data: bytes, offset: int) -> None:
+    if hasattr(os, "pwrite"):
+        os.pwrite(fd, data, offset)
+    else:
+        os.lseek(fd, offset, os.SEEK_SET)
+        os.write(fd, data)